@@ -1,15 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
+import asyncio
 import bcrypt  # Replaces passlib
+import hashlib
+import hmac
 import os
+import secrets
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from backend.cache import LRUCache
 
 # Config
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# Work factor for new hashes; logins rehash passwords stored at any other cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Hashes computed at once; bcrypt releases the GIL, so these run truly parallel
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+# Hashes running or waiting; beyond this logins are turned away with a 503
+BCRYPT_QUEUE_LIMIT = int(os.getenv("BCRYPT_QUEUE_LIMIT", 16))
+BCRYPT_RETRY_AFTER = int(os.getenv("BCRYPT_RETRY_AFTER", 2))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+# Verified tokens remembered so repeat requests skip signature checks
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
@@ -23,7 +40,61 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     if isinstance(password, str):
         password = password.encode('utf-8')
-    return bcrypt.hashpw(password, bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    True when a stored hash ("$2b$<cost>$...") was made with a different work factor.
+    """
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+# --- bcrypt pool ---
+# Each check takes hundreds of milliseconds of CPU, so it runs on a small
+# dedicated pool instead of the event loop, and a burst of logins beyond the
+# queue limit is rejected immediately rather than delaying every other request.
+
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_in_flight = 0
+_bcrypt_rejected = 0
+
+async def _run_bcrypt(fn, *args):
+    global _bcrypt_in_flight, _bcrypt_rejected
+    if _bcrypt_in_flight >= BCRYPT_QUEUE_LIMIT:
+        _bcrypt_rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins at once, try again shortly",
+            headers={"Retry-After": str(BCRYPT_RETRY_AFTER)},
+        )
+    _bcrypt_in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, fn, *args)
+    finally:
+        _bcrypt_in_flight -= 1
+
+async def check_password(plain_password, hashed_password) -> bool:
+    """
+    verify_password on the bcrypt pool.
+    """
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
+async def hash_password(password) -> str:
+    """
+    get_password_hash on the bcrypt pool.
+    """
+    return await _run_bcrypt(get_password_hash, password)
+
+def bcrypt_stats() -> dict:
+    return {
+        "rounds": BCRYPT_ROUNDS,
+        "workers": BCRYPT_WORKERS,
+        "in_flight": _bcrypt_in_flight,
+        "queue_limit": BCRYPT_QUEUE_LIMIT,
+        "rejected": _bcrypt_rejected
+    }
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -35,19 +106,41 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def new_refresh_token() -> str:
+    """
+    Opaque random refresh token; only its HMAC is ever stored.
+    """
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+# sha256(token) -> (user, exp). Keyed by digest so raw tokens are never kept
+# around; an entry past its exp is treated as a miss and decoded again, which
+# rejects it as expired.
+token_cache = LRUCache(TOKEN_CACHE_SIZE)
+
 async def get_current_user_token(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    key = hashlib.sha256(token.encode()).digest()
+    entry = token_cache.get(key, is_valid=lambda e: e[1] > time.time())
+    if entry is not None:
+        return dict(entry[0])
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         role: str = payload.get("role")
         if username is None:
             raise credentials_exception
-        return {"username": username, "role": role}
+        user = {"username": username, "role": role}
+        if isinstance(payload.get("exp"), (int, float)):
+            token_cache.set(key, (user, payload["exp"]))
+        return dict(user)
     except JWTError:
         raise credentials_exception
 
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+# Config
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 256))
+# Upper bound on staleness for writes this process cannot see (scripts, other workers)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry and counts hits and misses.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None, is_valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Look up `key`; an entry rejected by `is_valid` is dropped and counts as a miss.
+        """
+        if key in self._entries:
+            value = self._entries[key]
+            if is_valid is None or is_valid(value):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# --- Table versions ---
+# Routers bump the tables they wrote to after the write has committed. A cached
+# response remembers the versions it was built from and is discarded as soon
+# as any of them moves on.
+
+_table_versions: Dict[str, int] = {}
+
+def bump(*tables: str):
+    for table in tables:
+        _table_versions[table] = _table_versions.get(table, 0) + 1
+
+def table_versions(tables: Iterable[str]) -> Tuple[int, ...]:
+    return tuple(_table_versions.get(table, 0) for table in tables)
+
+# Counters restart at zero with the process, so validators also carry a
+# per-boot nonce; a restart can never revive an ETag handed out earlier
+BOOT_NONCE = uuid.uuid4().hex
+
+def etag(tables: Iterable[str], *parts: Any) -> str:
+    """
+    Strong ETag for a response built from `tables` and the request `parts`.
+    """
+    raw = "|".join([BOOT_NONCE, repr(table_versions(tables)), *map(str, parts)])
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+def content_etag(body: bytes) -> str:
+    """
+    Strong ETag for a fixed response body; identical across processes and restarts.
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or tag in candidates or f"W/{tag}" in candidates
+
+# --- Response cache ---
+
+response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+async def cached(
+    route: str,
+    tables: Tuple[str, ...],
+    loader: Callable[[], Awaitable[Any]],
+    params: Optional[dict] = None
+) -> Any:
+    """
+    Return the cached result of `loader` for this route and parameters, or run it.
+
+    Exceptions from the loader propagate and are never cached.
+    """
+    key = (route, tuple(sorted((params or {}).items())))
+    # Snapshot before loading: a write landing mid-load leaves the entry stale, never wrong
+    versions = table_versions(tables)
+    entry = response_cache.get(
+        key, is_valid=lambda e: e[0] == versions and e[1] > time.monotonic()
+    )
+    if entry is not None:
+        return entry[2]
+
+    value = await loader()
+    response_cache.set(key, (versions, time.monotonic() + RESPONSE_CACHE_TTL, value))
+    return value
@@ -1,6 +1,16 @@
+import asyncio
 import os
+import re
+import sqlite3
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+import aiosqlite
+import asyncpg
 from databases import Database
 from dotenv import load_dotenv
+from fastapi import HTTPException
+from backend.sqlite_profile import ProfiledConnection, ReadOnlyProfiledConnection
 
 load_dotenv()
 
@@ -11,10 +21,261 @@ POSTGRES_SERVER = os.getenv("POSTGRES_SERVER", "localhost")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "business_photography")
 
-# DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+# Set DATABASE_URL to this (or any postgresql:// URL) to run on Postgres
+POSTGRES_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./business.db")
+# Postgres connection pool; asyncpg keeps this many prepared statements per connection
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+# 0 disables the cache, which pgbouncer in transaction mode requires
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# Read-only SQLite connections for SELECTs; 0 sends reads through `database`
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", min(4, os.cpu_count() or 1)))
+# Write transactions waiting for the writer; beyond this callers get a 503
+WRITE_QUEUE_LIMIT = int(os.getenv("WRITE_QUEUE_LIMIT", 64))
+WRITE_RETRY_AFTER = int(os.getenv("WRITE_RETRY_AFTER", 1))
 
-database = Database(DATABASE_URL)
+def _iso(value) -> str:
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+async def _init_postgres_connection(connection: asyncpg.Connection):
+    """
+    Make Postgres' native types look like SQLite's to the routers.
+
+    Columns stay UUID, NUMERIC, DATE and TIMESTAMP in the database, but ids
+    come back as str, money as float and dates and timestamps as ISO strings,
+    and parameters are accepted in the same forms.
+    """
+    await connection.set_type_codec("uuid", schema="pg_catalog", encoder=str, decoder=str, format="text")
+    await connection.set_type_codec("numeric", schema="pg_catalog", encoder=str, decoder=float, format="text")
+    for name in ("date", "timestamp"):
+        await connection.set_type_codec(name, schema="pg_catalog", encoder=_iso, decoder=str, format="text")
+
+if DATABASE_URL.startswith("sqlite"):
+    # Passed through to sqlite3.connect for every connection the backend opens
+    database = Database(DATABASE_URL, factory=ProfiledConnection)
+else:
+    # Passed through to asyncpg.create_pool
+    database = Database(
+        DATABASE_URL,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        init=_init_postgres_connection
+    )
+
+# "sqlite" or "postgresql"; backend/dialect.py holds the SQL that differs
+DIALECT = "postgresql" if database.url.dialect in ("postgres", "postgresql") else database.url.dialect
 
 async def get_database():
     return database
+
+def is_foreign_key_violation(e: Exception) -> bool:
+    if isinstance(e, sqlite3.IntegrityError):
+        return "FOREIGN KEY" in str(e)
+    return isinstance(e, asyncpg.ForeignKeyViolationError)
+
+_NAMED_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+
+def _positional(query: str) -> tuple:
+    """
+    Rewrite :name parameters as asyncpg's $1, $2, ... and list the names in order.
+    """
+    names = []
+
+    def number(match):
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}"
+
+    return _NAMED_PARAM.sub(number, query), names
+
+async def execute_many(query: str, values: list):
+    """
+    Run `query` once per dict in `values` with the driver's own executemany.
+
+    databases' execute_many compiles and runs every row as a separate
+    statement; the driver sends the whole batch in one call. Inside
+    a transaction this shares the transaction's connection.
+    """
+    if not values:
+        return
+    if DIALECT == "postgresql":
+        query, names = _positional(query)
+        values = [tuple(v[name] for name in names) for v in values]
+    async with database.connection() as connection:
+        await connection.raw_connection.executemany(query, values)
+
+# --- Readers ---
+
+class ReadPool:
+    """
+    Fixed set of read-only SQLite connections for SELECTs.
+
+    databases pins one connection to the calling task, so queries gathered
+    inside a request still run one after another on one aiosqlite thread.
+    Each connection here has its own thread and queries go to whichever is
+    idle; sqlite3 releases the GIL while a statement runs, so gathered reads
+    proceed side by side. WAL lets them read while a write commits.
+    Rows come back as plain dicts.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._connections: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self.queries = 0
+        self.waits = 0
+
+    @property
+    def is_connected(self) -> bool:
+        return bool(self._connections)
+
+    async def connect(self):
+        uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            connection = await aiosqlite.connect(uri, uri=True, factory=ReadOnlyProfiledConnection)
+            connection.row_factory = sqlite3.Row
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+
+    async def disconnect(self):
+        for connection in self._connections:
+            await connection.close()
+        self._connections = []
+        self._idle = None
+
+    @asynccontextmanager
+    async def _acquire(self):
+        if self._idle.empty():
+            self.waits += 1
+        connection = await self._idle.get()
+        self.queries += 1
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def fetch_all(self, query: str, values: Optional[dict] = None) -> List[dict]:
+        async with self._acquire() as connection:
+            async with connection.execute(query, values or {}) as cursor:
+                return [dict(r) for r in await cursor.fetchall()]
+
+    async def fetch_one(self, query: str, values: Optional[dict] = None) -> Optional[dict]:
+        async with self._acquire() as connection:
+            async with connection.execute(query, values or {}) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row is not None else None
+
+    async def fetch_val(self, query: str, values: Optional[dict] = None, column: int = 0):
+        async with self._acquire() as connection:
+            async with connection.execute(query, values or {}) as cursor:
+                row = await cursor.fetchone()
+                return row[column] if row is not None else None
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "queries": self.queries,
+            "waits": self.waits
+        }
+
+if DIALECT == "sqlite" and READ_POOL_SIZE > 0 and database.url.database not in ("", ":memory:"):
+    readers = ReadPool(database.url.database, READ_POOL_SIZE)
+else:
+    # Same fetch_* interface; reads share the backend's own connections
+    readers = database
+
+# --- Writer ---
+
+class WriteQueue:
+    """
+    Runs write transactions one at a time, in arrival order.
+
+    SQLite takes one writer at a time anyway; queueing here means a waiting
+    write costs nothing instead of spinning in busy_timeout, and a burst of
+    writes is turned away with a 503 once WRITE_QUEUE_LIMIT are waiting.
+    Postgres handles concurrent writers itself, so there it is a plain
+    database.transaction().
+    """
+
+    def __init__(self, limit: int, serialize: bool):
+        self.limit = limit
+        self.serialize = serialize
+        self._lock = asyncio.Lock()
+        self._owner: Optional[asyncio.Task] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        database.transaction() behind the queue. Nesting in the same task joins the outer one.
+        """
+        if not self.serialize or self._owner is asyncio.current_task():
+            async with database.transaction():
+                yield
+            return
+
+        if self.pending >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many pending writes, try again shortly",
+                headers={"Retry-After": str(WRITE_RETRY_AFTER)}
+            )
+        self.pending += 1
+        try:
+            await self._lock.acquire()
+        finally:
+            self.pending -= 1
+        self._owner = asyncio.current_task()
+        try:
+            async with database.transaction():
+                yield
+            self.completed += 1
+        finally:
+            self._owner = None
+            self._lock.release()
+
+    async def execute(self, query: str, values: Optional[dict] = None):
+        """
+        A single write statement as its own queued transaction.
+        """
+        async with self.transaction():
+            return await database.execute(query=query, values=values)
+
+    async def fetch_one(self, query: str, values: Optional[dict] = None):
+        """
+        A single write with RETURNING as its own queued transaction.
+        """
+        async with self.transaction():
+            return await database.fetch_one(query=query, values=values)
+
+    def stats(self) -> dict:
+        return {
+            "serialized": self.serialize,
+            "pending": self.pending,
+            "queue_limit": self.limit,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+writer = WriteQueue(WRITE_QUEUE_LIMIT, serialize=DIALECT == "sqlite")
+
+async def connect():
+    await database.connect()
+    if readers is not database:
+        # Open a writer connection first: it switches the file to WAL, which
+        # the read-only connections cannot do themselves
+        await database.fetch_one(query="PRAGMA journal_mode")
+        await readers.connect()
+
+async def disconnect():
+    if readers is not database:
+        await readers.disconnect()
+    await database.disconnect()
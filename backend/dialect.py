@@ -0,0 +1,63 @@
+from backend.database import DIALECT
+
+# SQL fragments that differ between SQLite and Postgres. Both backends hand
+# dates back as ISO strings (see database.py), so each pair below only has to
+# produce the same text, not the same Python type. Every helper takes the
+# dialect explicitly so backend/schema.py can render either one.
+
+SQLITE = "sqlite"
+POSTGRES = "postgresql"
+
+def to_date(expr: str, dialect: str = DIALECT) -> str:
+    """
+    The calendar date of a date or timestamp expression.
+    """
+    if dialect == POSTGRES:
+        return f"CAST({expr} AS DATE)"
+    return f"date({expr})"
+
+def truncate_date(expr: str, unit: str, dialect: str = DIALECT) -> str:
+    """
+    The date the day, ISO week (from Monday), month or quarter of `expr` starts on.
+    """
+    if unit not in ("day", "week", "month", "quarter"):
+        raise ValueError(f"Unknown unit: {unit}")
+    if dialect == POSTGRES:
+        return f"CAST(date_trunc('{unit}', {expr}) AS DATE)"
+    if unit == "day":
+        return f"date({expr})"
+    if unit == "week":
+        # Monday on or before the date
+        return f"date({expr}, '-6 days', 'weekday 1')"
+    if unit == "month":
+        return f"date({expr}, 'start of month')"
+    # Step back (month - 1) mod 3 months. Spelled without '%' because the
+    # databases SQLite backend does not escape it in parameterised queries.
+    month = f"(CAST(substr({expr}, 6, 2) AS INTEGER) - 1)"
+    return f"date({expr}, 'start of month', '-' || ({month} - 3 * ({month} / 3)) || ' months')"
+
+def prefix_match(column: str, param: str, dialect: str = DIALECT) -> str:
+    """
+    Case-insensitive LIKE against :param, with backslash as the escape character.
+    """
+    # SQLite's LIKE already ignores ASCII case; Postgres needs ILIKE
+    operator = "ILIKE" if dialect == POSTGRES else "LIKE"
+    return f"{column} {operator} :{param} ESCAPE '\\'"
+
+def json_object_array(alias: str, fields: tuple, source: str, order_by: str, dialect: str = DIALECT) -> str:
+    """
+    Scalar subquery turning the rows of `source` (a FROM/WHERE clause over
+    `alias`) into a JSON array of objects with `fields`, in `order_by` order.
+    """
+    pairs = ", ".join(f"'{f}', {alias}.{f}" for f in fields)
+    if dialect == POSTGRES:
+        return f"COALESCE((SELECT json_agg(json_build_object({pairs}) ORDER BY {order_by}) {source}), '[]')"
+    # json_group_array has no ORDER BY of its own; it follows the subquery's order
+    return f"(SELECT json_group_array(json_object({pairs})) FROM (SELECT * {source} ORDER BY {order_by}) {alias})"
+
+def for_update(dialect: str = DIALECT) -> str:
+    """
+    Row lock for a SELECT that a write in the same transaction depends on.
+    SQLite's writer queue already serializes those transactions.
+    """
+    return " FOR UPDATE" if dialect == POSTGRES else ""
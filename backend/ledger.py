@@ -0,0 +1,153 @@
+from datetime import date
+from typing import List, Union
+from backend.database import database, writer
+from backend.dialect import truncate_date
+
+# monthly_rollups holds one row per (month, source) with the money that month
+# contributes to the dashboard. Every write that moves money calls one of the
+# record_* helpers inside the same writer.transaction() as the write itself,
+# so the rollups never disagree with the tables they summarise.
+#
+# Sources mirror the dashboard's definitions:
+#   event   - events.base_price as revenue, plus the event count
+#   expense - event_costs, attributed to the month of their event
+#   manual  - transactions, Credit as revenue and Debit as expenses
+#
+# The same helpers keep events.total_cost and events.net_profit in step with
+# event_costs, so per-event profit is a column read.
+
+UPSERT_ROLLUP_QUERY = """
+    INSERT INTO monthly_rollups (month, source, revenue, expenses, event_count)
+    VALUES (:month, :source, :revenue, :expenses, :event_count)
+    ON CONFLICT(month, source) DO UPDATE SET
+        revenue = monthly_rollups.revenue + excluded.revenue,
+        expenses = monthly_rollups.expenses + excluded.expenses,
+        event_count = monthly_rollups.event_count + excluded.event_count
+"""
+
+# Rollups recomputed from the source tables, one GROUP BY per source
+FRESH_ROLLUPS_QUERY = f"""
+    SELECT {truncate_date('event_date', 'month')} as month, 'event' as source,
+           COALESCE(SUM(base_price), 0) as revenue, 0 as expenses, COUNT(*) as event_count
+    FROM events
+    GROUP BY 1
+    UNION ALL
+    SELECT {truncate_date('e.event_date', 'month')} as month, 'expense' as source,
+           0 as revenue, COALESCE(SUM(ec.amount), 0) as expenses, 0 as event_count
+    FROM event_costs ec
+    JOIN events e ON ec.event_id = e.id
+    GROUP BY 1
+    UNION ALL
+    SELECT {truncate_date('date', 'month')} as month, 'manual' as source,
+           COALESCE(SUM(CASE WHEN type = 'Credit' THEN amount ELSE 0 END), 0) as revenue,
+           COALESCE(SUM(CASE WHEN type = 'Debit' THEN amount ELSE 0 END), 0) as expenses,
+           0 as event_count
+    FROM transactions
+    GROUP BY 1
+"""
+
+EVENT_TOTALS_REBUILD = """
+    UPDATE events SET
+        total_cost = COALESCE((SELECT SUM(amount) FROM event_costs WHERE event_id = events.id), 0),
+        net_profit = COALESCE(base_price, 0) - COALESCE((SELECT SUM(amount) FROM event_costs WHERE event_id = events.id), 0)
+"""
+
+EVENT_TOTALS_DRIFT_QUERY = """
+    SELECT e.id, e.total_cost, COALESCE(SUM(ec.amount), 0) as expected
+    FROM events e
+    LEFT JOIN event_costs ec ON ec.event_id = e.id
+    GROUP BY e.id, e.total_cost, e.base_price, e.net_profit
+    HAVING ABS(COALESCE(e.total_cost, 0) - COALESCE(SUM(ec.amount), 0)) > :tolerance
+        OR ABS(COALESCE(e.net_profit, 0) - (COALESCE(e.base_price, 0) - COALESCE(SUM(ec.amount), 0))) > :tolerance
+"""
+
+REBUILD_STATEMENTS = [
+    "DELETE FROM monthly_rollups",
+    f"INSERT INTO monthly_rollups (month, source, revenue, expenses, event_count) {FRESH_ROLLUPS_QUERY}",
+    EVENT_TOTALS_REBUILD,
+]
+
+# Float sums built up incrementally can differ from a fresh SUM in the last digits
+DRIFT_TOLERANCE = 0.005
+
+def month_of(value: Union[date, str]) -> str:
+    """
+    First day of the month for a date or ISO date/timestamp string.
+    """
+    return f"{str(value)[:7]}-01"
+
+async def apply_rollup(month: str, source: str, revenue: float = 0.0, expenses: float = 0.0, event_count: int = 0):
+    await database.execute(query=UPSERT_ROLLUP_QUERY, values={
+        "month": month,
+        "source": source,
+        "revenue": revenue,
+        "expenses": expenses,
+        "event_count": event_count
+    })
+
+async def record_event(event_date: Union[date, str], base_price: float, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) an event's income and count.
+    """
+    await apply_rollup(month_of(event_date), "event", revenue=sign * (base_price or 0.0), event_count=sign)
+
+async def record_event_price_change(event_date: Union[date, str], delta: float):
+    if delta:
+        await apply_rollup(month_of(event_date), "event", revenue=delta)
+
+async def record_event_cost(event_id: str, delta: float):
+    """
+    Apply a change in an event's total cost to the event's totals and to its month.
+
+    Costs whose event does not exist are invisible to the dashboard's join,
+    so they are skipped here too.
+    """
+    if not delta:
+        return
+    query = """
+        UPDATE events
+        SET total_cost = COALESCE(total_cost, 0) + :delta,
+            net_profit = COALESCE(base_price, 0) - (COALESCE(total_cost, 0) + :delta)
+        WHERE id = :id
+        RETURNING event_date
+    """
+    event = await database.fetch_one(query=query, values={"id": str(event_id), "delta": delta})
+    if event:
+        await apply_rollup(month_of(event["event_date"]), "expense", expenses=delta)
+
+async def record_transaction(tx_date: Union[date, str], tx_type: str, amount: float, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) a manual transaction.
+    """
+    if tx_type == "Credit":
+        await apply_rollup(month_of(tx_date), "manual", revenue=sign * amount)
+    elif tx_type == "Debit":
+        await apply_rollup(month_of(tx_date), "manual", expenses=sign * amount)
+
+async def rebuild_rollups():
+    """
+    Recompute every rollup row and every event's cost totals from the source tables.
+    """
+    async with writer.transaction():
+        for statement in REBUILD_STATEMENTS:
+            await database.execute(query=statement)
+
+async def find_rollup_drift() -> List[dict]:
+    """
+    Compare the stored rollups and event totals with a fresh aggregation and list every mismatch.
+    """
+    fresh = {(r["month"], r["source"]): r for r in await database.fetch_all(query=FRESH_ROLLUPS_QUERY)}
+    stored = {(r["month"], r["source"]): r for r in await database.fetch_all(query="SELECT * FROM monthly_rollups")}
+
+    drift = []
+    for r in await database.fetch_all(query=EVENT_TOTALS_DRIFT_QUERY, values={"tolerance": DRIFT_TOLERANCE}):
+        drift.append({"month": "-", "source": f"event {r['id']}", "field": "total_cost", "expected": r["expected"], "actual": r["total_cost"]})
+    for key in sorted(set(fresh) | set(stored)):
+        expected = fresh.get(key)
+        actual = stored.get(key)
+        for field in ("revenue", "expenses", "event_count"):
+            want = expected[field] if expected else 0
+            got = actual[field] if actual else 0
+            if abs((want or 0) - (got or 0)) > DRIFT_TOLERANCE:
+                drift.append({"month": key[0], "source": key[1], "field": field, "expected": want, "actual": got})
+    return drift
@@ -1,13 +1,19 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from backend.database import database
+from backend.database import connect, database, disconnect, readers, writer
+from backend.sqlite_profile import active_settings
+from backend import pdf
+from backend.auth import bcrypt_stats, token_cache
+from backend.cache import response_cache
+from backend.pagination import NEXT_CURSOR_HEADER
 from backend.routers import auth, events, dashboard
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await database.connect()
+    await connect()
     yield
-    await database.disconnect()
+    pdf.shutdown()
+    await disconnect()
 
 app = FastAPI(title="Business Photography System", lifespan=lifespan)
 
@@ -18,6 +24,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(auth.router)
@@ -36,4 +43,14 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "database": "connected" if database.is_connected else "disconnected"}
+    return {
+        "status": "ok",
+        "database": "connected" if database.is_connected else "disconnected",
+        "sqlite": await active_settings(database) if database.url.dialect == "sqlite" else None,
+        "readers": readers.stats() if readers is not database else None,
+        "writer": writer.stats(),
+        "response_cache": response_cache.stats(),
+        "pdf": pdf.stats(),
+        "bcrypt": bcrypt_stats(),
+        "token_cache": token_cache.stats()
+    }
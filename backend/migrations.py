@@ -0,0 +1,148 @@
+import asyncpg
+from typing import List
+from uuid import uuid4
+from backend import schema
+from backend.auth import get_password_hash
+from backend.database import DIALECT, database, writer
+from backend.ledger import EVENT_TOTALS_REBUILD, REBUILD_STATEMENTS
+
+# Numbered schema migrations, applied in order by scripts/migrate.py.
+#
+# The database remembers the last migration it received: PRAGMA user_version
+# on SQLite (kept in the file header, so reading it touches no table) and
+# schema_migrations on Postgres. A boot against an up-to-date database is
+# that one read. schema_migrations also keeps the history on both.
+#
+# Each migration runs in its own transaction together with its version bump.
+# Databases built by the old scripts/deploy_db.py start at version 0 with most
+# of the schema already present, and the baseline builds new ones from the
+# current backend/schema.py, so migrations must tolerate finding their work
+# done: use IF NOT EXISTS and add_column. Append new migrations; never edit or
+# renumber one that has shipped.
+
+async def current_version() -> int:
+    if DIALECT == "sqlite":
+        return await database.fetch_val(query="PRAGMA user_version")
+    try:
+        return await database.fetch_val(query="SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    except asyncpg.UndefinedTableError:
+        return 0
+
+async def column_exists(table: str, column: str) -> bool:
+    if DIALECT == "sqlite":
+        rows = await database.fetch_all(query=f"PRAGMA table_info({table})")
+        return any(r["name"] == column for r in rows)
+    query = """
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column
+    """
+    return await database.fetch_one(query=query, values={"table": table, "column": column}) is not None
+
+async def add_column(table: str, column: str) -> bool:
+    """
+    Add a column defined in backend/schema.py unless the table already has it.
+    """
+    if await column_exists(table, column):
+        return False
+    await database.execute(query=f"ALTER TABLE {table} ADD COLUMN {column} {schema.column_sql(table, column, DIALECT)}")
+    print(f"Added {table}.{column}.")
+    return True
+
+async def _baseline():
+    """
+    What scripts/deploy_db.py used to do on every boot, once: create missing
+    tables, add the columns older databases lack, create indexes, backfill
+    derived data and seed the admin user.
+    """
+    for statement in schema.table_statements(DIALECT):
+        await database.execute(query=statement)
+
+    # Cost totals kept in step with event_costs by backend/ledger.py
+    added_totals = [
+        await add_column("events", "total_cost"),
+        await add_column("events", "net_profit"),
+    ]
+    await add_column("cameras", "purchase_price")
+    await add_column("cameras", "max_shutter_life")
+    # Added for statement imports
+    await add_column("transactions", "content_hash")
+    # Invoice line order
+    await add_column("invoice_items", "position")
+
+    for statement in schema.index_statements(DIALECT):
+        await database.execute(query=statement)
+
+    if any(added_totals):
+        await database.execute(query=EVENT_TOTALS_REBUILD)
+        print("Event cost totals backfilled.")
+
+    # Rollups for databases that predate the table
+    if await database.fetch_one(query="SELECT 1 FROM monthly_rollups LIMIT 1") is None:
+        for statement in REBUILD_STATEMENTS:
+            await database.execute(query=statement)
+        print("Monthly rollups built.")
+
+    if await database.fetch_one(query="SELECT 1 FROM users WHERE username = 'admin'") is None:
+        await database.execute(
+            query="""
+            INSERT INTO users (id, username, email, password_hash, role)
+            VALUES (:id, 'admin', 'admin@example.com', :password_hash, 'admin')
+            """,
+            values={"id": str(uuid4()), "password_hash": get_password_hash("password")}
+        )
+        print("Admin user seeded.")
+
+async def _hot_path_indexes():
+    """
+    Indexes for the lookups every dashboard and event page makes.
+    """
+    # events(event_date) and invoice_items(invoice_id) are repeated for
+    # databases that predate the baseline's indexes
+    statements = [
+        "CREATE INDEX IF NOT EXISTS idx_events_event_date ON events(event_date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions(type, date)",
+        "CREATE INDEX IF NOT EXISTS idx_event_costs_event_id ON event_costs(event_id)",
+        "CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id ON invoice_items(invoice_id)",
+    ]
+    for statement in statements:
+        await database.execute(query=statement)
+
+async def _invoice_export_indexes():
+    """
+    Keyset order for the invoice ZIP export, with and without a status filter.
+    """
+    statements = [
+        "CREATE INDEX IF NOT EXISTS idx_invoices_issued_date ON invoices(issued_date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_status_issued ON invoices(status, issued_date, id)",
+    ]
+    for statement in statements:
+        await database.execute(query=statement)
+
+MIGRATIONS = [
+    (1, "baseline", _baseline),
+    (2, "hot path indexes", _hot_path_indexes),
+    (3, "invoice export indexes", _invoice_export_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+async def migrate() -> List[int]:
+    """
+    Apply every migration newer than the database. Returns the versions applied.
+    """
+    version = await current_version()
+    applied = []
+    for number, name, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        async with writer.transaction():
+            await apply()
+            await database.execute(
+                query="INSERT INTO schema_migrations (version, name) VALUES (:version, :name)",
+                values={"version": number, "name": name}
+            )
+            if DIALECT == "sqlite":
+                await database.execute(query=f"PRAGMA user_version = {number}")
+        print(f"Applied migration {number}: {name}")
+        applied.append(number)
+    return applied
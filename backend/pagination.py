@@ -0,0 +1,31 @@
+from typing import Optional, Tuple
+from fastapi import HTTPException, Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Keyset cursors are "<sort key>,<id>" of the last row on the previous page.
+# Lists that page this way return a plain JSON array and put the cursor for
+# the following page in this header; it is absent on the last page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def parse_cursor(after: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not after:
+        return None
+    key, sep, row_id = after.partition(",")
+    if not sep or not key or not row_id:
+        raise HTTPException(status_code=400, detail="Cursor must look like '<sort key>,<id>'")
+    return key, row_id
+
+def make_cursor(key, row_id) -> str:
+    return f"{key},{row_id}"
+
+def paginate(rows: list, limit: int, response: Response, key_field: str, id_field: str = "id") -> list:
+    """
+    Trim a `limit + 1` row fetch to one page and advertise the next cursor.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = make_cursor(last[key_field], last[id_field])
+    return rows
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+
+# Config
+# "process" keeps renders off the GIL entirely; "thread" avoids worker start-up
+# and is enough on single-core hosts
+PDF_EXECUTOR = os.getenv("PDF_EXECUTOR", "process")
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))
+# Renders running or waiting; beyond this callers get a 503
+PDF_QUEUE_LIMIT = int(os.getenv("PDF_QUEUE_LIMIT", PDF_WORKERS * 4))
+PDF_RETRY_AFTER = int(os.getenv("PDF_RETRY_AFTER", 5))
+# Rendered PDFs are kept on disk; point this at the data volume in production
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "./pdf_cache")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Bump when render_invoice_pdf's output changes so stale renders stop matching
+RENDER_VERSION = 1
+
+def render_invoice_pdf(invoice: dict, items: List[dict]) -> bytes:
+    """
+    Build the invoice document. Runs on a pool worker, so it takes and returns plain data.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Header
+    elements.append(Paragraph("INVOICE", styles['Title']))
+    elements.append(Spacer(1, 12))
+
+    # Info
+    elements.append(Paragraph(f"<b>Invoice #:</b> {invoice['invoice_number']}", styles['Normal']))
+    elements.append(Paragraph(f"<b>Date:</b> {invoice['issued_date']}", styles['Normal']))
+    elements.append(Paragraph(f"<b>Client:</b> {invoice['client_name']}", styles['Normal']))
+    elements.append(Spacer(1, 24))
+
+    # Table Data
+    data = [['Description', 'Qty', 'Unit Price', 'Amount']]
+    for item in items:
+        data.append([
+            item['description'],
+            str(item['quantity']),
+            f"RM {item['unit_price']:.2f}",
+            f"RM {item['amount']:.2f}"
+        ])
+
+    # Total
+    data.append(['', '', 'Total:', f"RM {invoice['total_amount']:.2f}"])
+
+    # Table Style
+    table = Table(data, colWidths=[300, 50, 100, 100])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]))
+
+    elements.append(table)
+
+    # Footer Notes
+    if invoice['notes']:
+        elements.append(Spacer(1, 24))
+        elements.append(Paragraph(f"Notes: {invoice['notes']}", styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+# --- Render pool ---
+
+_executor: Optional[Executor] = None
+_in_flight = 0
+_rejected = 0
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PDF_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
+        else:
+            # spawn: forking a process that already runs the event loop and
+            # the database driver's threads is not safe
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+def saturated() -> bool:
+    return _in_flight >= PDF_QUEUE_LIMIT
+
+def busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="PDF renderer is busy, try again shortly",
+        headers={"Retry-After": str(PDF_RETRY_AFTER)}
+    )
+
+async def render(invoice: dict, items: List[dict]) -> bytes:
+    """
+    Render on the pool without blocking the event loop; 503 when the queue is full.
+    """
+    global _in_flight, _rejected
+    if saturated():
+        _rejected += 1
+        raise busy_error()
+    _in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), render_invoice_pdf, invoice, items)
+    finally:
+        _in_flight -= 1
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+# --- Disk cache ---
+# Files are named after a hash of everything the render reads, so an edited
+# invoice simply stops matching its old file. Recency is the file's mtime,
+# refreshed on every hit; eviction drops the oldest files once the directory
+# grows past PDF_CACHE_MAX_BYTES.
+
+_cache_bytes: Optional[int] = None
+_cache_hits = 0
+_cache_misses = 0
+_cache_evictions = 0
+
+def render_key(invoice: dict, items: List[dict]) -> str:
+    payload = json.dumps({"v": RENDER_VERSION, "invoice": invoice, "items": items}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def render_etag(key: str) -> str:
+    return f'"{key[:32]}"'
+
+def _cache_path(key: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, key[:2], f"{key}.pdf")
+
+def _cached_files() -> List[Tuple[float, int, str]]:
+    files = []
+    for root, _, names in os.walk(PDF_CACHE_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    return files
+
+def _store(key: str, content: bytes) -> str:
+    """
+    Write a render atomically and evict least recently used files over the cap.
+    """
+    global _cache_bytes, _cache_evictions
+    path = _cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+    if _cache_bytes is None:
+        _cache_bytes = sum(size for _, size, _ in _cached_files())
+    else:
+        _cache_bytes += len(content)
+    if _cache_bytes > PDF_CACHE_MAX_BYTES:
+        # Rescan: other workers share the directory. Trim to 90% so every
+        # store after the cap is reached does not trigger a full scan.
+        files = sorted(_cached_files())
+        _cache_bytes = sum(size for _, size, _ in files)
+        for _, size, old in files:
+            if _cache_bytes <= PDF_CACHE_MAX_BYTES * 0.9:
+                break
+            if old == path:
+                continue
+            try:
+                os.remove(old)
+                _cache_bytes -= size
+                _cache_evictions += 1
+            except FileNotFoundError:
+                pass
+    return path
+
+def _touch(path: str) -> bool:
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+async def render_cached(key: str, invoice: dict, items: List[dict]) -> str:
+    """
+    Path to the PDF for `key` (from render_key), rendering only on a cache miss.
+    """
+    global _cache_hits, _cache_misses
+    path = _cache_path(key)
+    if await asyncio.to_thread(_touch, path):
+        _cache_hits += 1
+    else:
+        _cache_misses += 1
+        content = await render(invoice, items)
+        path = await asyncio.to_thread(_store, key, content)
+    return path
+
+def stats() -> dict:
+    lookups = _cache_hits + _cache_misses
+    return {
+        "executor": PDF_EXECUTOR,
+        "workers": PDF_WORKERS,
+        "in_flight": _in_flight,
+        "queue_limit": PDF_QUEUE_LIMIT,
+        "rejected": _rejected,
+        "cache": {
+            "bytes": _cache_bytes,
+            "max_bytes": PDF_CACHE_MAX_BYTES,
+            "hits": _cache_hits,
+            "misses": _cache_misses,
+            "evictions": _cache_evictions,
+            "hit_rate": round(_cache_hits / lookups, 4) if lookups else 0.0
+        }
+    }
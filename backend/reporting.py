@@ -0,0 +1,154 @@
+import asyncio
+from datetime import date, timedelta
+from typing import List, Optional
+from backend.database import readers
+from backend.dialect import truncate_date
+
+GRANULARITIES = ("day", "week", "month", "quarter")
+
+# Keep a single response from turning into thousands of chart points
+MAX_BUCKETS = 1000
+
+def bucket_expr(column: str, granularity: str) -> str:
+    """
+    SQL expression mapping a date column to the ISO date its bucket starts on.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    return truncate_date(column, granularity)
+
+def bucket_start(d: date, granularity: str) -> date:
+    if granularity == "day":
+        return d
+    if granularity == "week":
+        return d - timedelta(days=d.weekday())
+    if granularity == "month":
+        return d.replace(day=1)
+    if granularity == "quarter":
+        return date(d.year, d.month - (d.month - 1) % 3, 1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def next_bucket(d: date, granularity: str) -> date:
+    if granularity == "day":
+        return d + timedelta(days=1)
+    if granularity == "week":
+        return d + timedelta(days=7)
+    step = 1 if granularity == "month" else 3
+    m = d.month - 1 + step
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+def bucket_label(d: date, granularity: str, with_year: bool = False) -> str:
+    """
+    Chart label for a bucket. Day, week and month labels only carry the year
+    when asked, i.e. when the window spans more than one year.
+    """
+    if granularity in ("day", "week"):
+        return d.strftime("%d %b %Y" if with_year else "%d %b")
+    if granularity == "month":
+        return d.strftime("%b %Y" if with_year else "%b")
+    return f"Q{(d.month - 1) // 3 + 1} {d.year}"
+
+def month_window(months: int, today: Optional[date] = None) -> tuple:
+    """
+    First day of the month `months - 1` months ago and the last day of the current month.
+    """
+    today = today or date.today()
+    m = today.month - 1 - (months - 1)
+    start = date(today.year + m // 12, m % 12 + 1, 1)
+    end = next_bucket(today.replace(day=1), "month") - timedelta(days=1)
+    return start, end
+
+def bucket_starts(start: date, end: date, granularity: str) -> List[date]:
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f"Window spans more than {MAX_BUCKETS} {granularity} buckets")
+        current = next_bucket(current, granularity)
+    return buckets
+
+async def financial_buckets(start: date, end: date, granularity: str = "month") -> List[dict]:
+    """
+    Revenue and expenses per bucket for the inclusive window [start, end].
+
+    Runs one GROUP BY per source (or a single one over monthly_rollups when the
+    window is whole months), so the cost does not depend on how many buckets
+    the window covers.
+    """
+    buckets = bucket_starts(start, end, granularity)
+    values = {"start": start.isoformat(), "end": (end + timedelta(days=1)).isoformat()}
+
+    # Whole-month windows at month or coarser granularity can be answered from
+    # the monthly rollups, which cost one row per month regardless of history
+    if granularity in ("month", "quarter") and start.day == 1 and (end + timedelta(days=1)).day == 1:
+        rollups_query = f"""
+            SELECT {bucket_expr('month', granularity)} as bucket, SUM(revenue) as revenue, SUM(expenses) as expenses
+            FROM monthly_rollups
+            WHERE month >= :start AND month < :end
+            GROUP BY bucket
+        """
+        rows = await readers.fetch_all(query=rollups_query, values=values)
+        return _trend(buckets, granularity,
+                      {r["bucket"]: r["revenue"] or 0 for r in rows},
+                      {r["bucket"]: r["expenses"] or 0 for r in rows})
+
+    # 1. Event income, bucketed by event date
+    events_query = f"""
+        SELECT {bucket_expr('event_date', granularity)} as bucket, SUM(base_price) as total
+        FROM events
+        WHERE event_date >= :start AND event_date < :end
+        GROUP BY bucket
+    """
+    # 2. Event costs, attributed to the date of the event they belong to
+    costs_query = f"""
+        SELECT {bucket_expr('e.event_date', granularity)} as bucket, SUM(ec.amount) as total
+        FROM event_costs ec
+        JOIN events e ON ec.event_id = e.id
+        WHERE e.event_date >= :start AND e.event_date < :end
+        GROUP BY bucket
+    """
+    # 3. Manual transactions, both directions in one pass
+    transactions_query = f"""
+        SELECT {bucket_expr('date', granularity)} as bucket,
+               SUM(CASE WHEN type = 'Credit' THEN amount ELSE 0 END) as credit,
+               SUM(CASE WHEN type = 'Debit' THEN amount ELSE 0 END) as debit
+        FROM transactions
+        WHERE date >= :start AND date < :end
+        GROUP BY bucket
+    """
+
+    # The three scans are independent, so they run on separate read connections
+    event_rows, cost_rows, transaction_rows = await asyncio.gather(
+        readers.fetch_all(query=events_query, values=values),
+        readers.fetch_all(query=costs_query, values=values),
+        readers.fetch_all(query=transactions_query, values=values)
+    )
+
+    revenue = {}
+    expenses = {}
+    for r in event_rows:
+        revenue[r["bucket"]] = revenue.get(r["bucket"], 0) + (r["total"] or 0)
+    for r in cost_rows:
+        expenses[r["bucket"]] = expenses.get(r["bucket"], 0) + (r["total"] or 0)
+    for r in transaction_rows:
+        revenue[r["bucket"]] = revenue.get(r["bucket"], 0) + (r["credit"] or 0)
+        expenses[r["bucket"]] = expenses.get(r["bucket"], 0) + (r["debit"] or 0)
+
+    return _trend(buckets, granularity, revenue, expenses)
+
+def _trend(buckets: List[date], granularity: str, revenue: dict, expenses: dict) -> List[dict]:
+    trend = []
+    # Labels double as the chart's x-axis keys, so they must not repeat
+    with_year = bool(buckets) and buckets[0].year != buckets[-1].year
+    for b in buckets:
+        key = b.isoformat()
+        label = bucket_label(b, granularity, with_year)
+        trend.append({
+            "period": key,
+            "label": label,
+            "month": label,  # Chart x-axis key
+            "revenue": revenue.get(key, 0),
+            "expenses": expenses.get(key, 0)
+        })
+    return trend
@@ -1,15 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from backend.auth import create_access_token, verify_password, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
-from backend.database import database
-from datetime import timedelta
+from backend.auth import (
+    create_access_token, check_password, hash_password, needs_rehash, new_refresh_token, hash_refresh_token,
+    ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+)
+from backend.database import database, readers, writer
+from datetime import datetime, timedelta
 from pydantic import BaseModel
+from typing import Optional
+import uuid
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+async def issue_tokens(username: str, role: str, family_id: Optional[str] = None) -> dict:
+    """
+    New access token plus a refresh token in `family_id` (a new family when None).
+    """
+    refresh_token = new_refresh_token()
+    await writer.execute(
+        query="""
+        INSERT INTO refresh_tokens (id, token_hash, family_id, username, expires_at)
+        VALUES (:id, :token_hash, :family_id, :username, :expires_at)
+        """,
+        values={
+            "id": str(uuid.uuid4()),
+            "token_hash": hash_refresh_token(refresh_token),
+            "family_id": family_id or str(uuid.uuid4()),
+            "username": username,
+            "expires_at": datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        }
+    )
+    access_token = create_access_token(
+        data={"sub": username, "role": role}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+async def revoke_family(family_id: str):
+    await writer.execute(
+        query="UPDATE refresh_tokens SET revoked_at = :now WHERE family_id = :family_id AND revoked_at IS NULL",
+        values={"now": datetime.utcnow(), "family_id": family_id}
+    )
 
 class UserCreate(BaseModel):
     username: str
@@ -21,7 +59,7 @@ class UserCreate(BaseModel):
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     # Fetch user from DB
     query = "SELECT * FROM users WHERE username = :username"
-    user = await database.fetch_one(query=query, values={"username": form_data.username})
+    user = await readers.fetch_one(query=query, values={"username": form_data.username})
     
     if not user:
         raise HTTPException(
@@ -30,18 +68,84 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(form_data.password, user["password_hash"]):
+    if not await check_password(form_data.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Upgrade the stored hash to the configured work factor while we have the password
+    if needs_rehash(user["password_hash"]):
+        try:
+            new_hash = await hash_password(form_data.password)
+            await writer.execute(
+                query="UPDATE users SET password_hash = :password_hash WHERE username = :username",
+                values={"password_hash": new_hash, "username": user["username"]}
+            )
+        except Exception as e:
+            # The login itself succeeded; try again next time
+            print(f"Error rehashing password: {e}")
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user["username"], "role": user["role"]}, expires_delta=access_token_expires
+    # Expired refresh tokens are no use to anyone
+    await writer.execute(
+        query="DELETE FROM refresh_tokens WHERE expires_at < :now", values={"now": datetime.utcnow()}
+    )
+    return await issue_tokens(user["username"], user["role"])
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshRequest):
+    """
+    Trade a refresh token for a new access token and a new refresh token.
+
+    Each refresh token works once. Presenting one that was already rotated
+    means it leaked, so the whole family is revoked and the user must log in.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    # One HMAC and one indexed lookup; no password hashing
+    query = """
+    SELECT rt.id, rt.family_id, rt.revoked_at, u.username, u.role
+    FROM refresh_tokens rt
+    JOIN users u ON u.username = rt.username
+    WHERE rt.token_hash = :token_hash AND rt.expires_at > :now
+    """
+    now = datetime.utcnow()
+    async with writer.transaction():
+        token = await database.fetch_one(query=query, values={
+            "token_hash": hash_refresh_token(body.refresh_token), "now": now
+        })
+        if not token:
+            raise invalid
+
+        if token["revoked_at"] is None:
+            # Rotate: the presented token is spent before its successor exists
+            rotated = await database.fetch_one(
+                query="UPDATE refresh_tokens SET revoked_at = :now WHERE id = :id AND revoked_at IS NULL RETURNING id",
+                values={"now": now, "id": token["id"]}
+            )
+            if rotated:
+                return await issue_tokens(token["username"], token["role"], token["family_id"])
+
+        await revoke_family(token["family_id"])
+    # Reuse: reject only once the family's revocation has committed
+    raise invalid
+
+@router.post("/logout")
+async def logout(body: RefreshRequest):
+    """
+    Revoke the refresh token's family; its access tokens lapse on their own.
+    """
+    token = await database.fetch_one(
+        query="SELECT family_id FROM refresh_tokens WHERE token_hash = :token_hash",
+        values={"token_hash": hash_refresh_token(body.refresh_token)}
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    if token:
+        await revoke_family(token["family_id"])
+    return {"message": "Logged out"}
 
 @router.post("/register", status_code=201)
 async def register_user(user: UserCreate):
@@ -55,13 +159,13 @@ async def register_user(user: UserCreate):
     if user.role not in ['admin', 'photographer']:
         raise HTTPException(status_code=400, detail="Invalid role")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     
     query = """
     INSERT INTO users (username, email, password_hash, role)
     VALUES (:username, :email, :password_hash, :role)
     """
-    await database.execute(query=query, values={
+    await writer.execute(query=query, values={
         "username": user.username,
         "email": user.email,
         "password_hash": hashed_password,
@@ -3,8 +3,9 @@ from pydantic import BaseModel
 from typing import Optional, List
 from uuid import UUID, uuid4
 from datetime import datetime
-from backend.database import database
+from backend.database import database, readers, writer
 from backend.auth import get_current_active_user
+from backend import cache
 
 router = APIRouter(
     prefix="/cameras",
@@ -56,8 +57,11 @@ async def register_camera(camera: CameraCreate, current_user: dict = Depends(get
     }
     
     try:
-        await database.execute(query=query, values=values)
+        await writer.execute(query=query, values=values)
+        cache.bump("cameras")
         return {**values, "created_at": str(created_at)}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error registering camera: {e}")
         raise HTTPException(status_code=500, detail="Failed to register camera")
@@ -66,7 +70,7 @@ async def register_camera(camera: CameraCreate, current_user: dict = Depends(get
 async def list_cameras(current_user: dict = Depends(get_current_active_user)):
     query = "SELECT * FROM cameras ORDER BY created_at DESC"
     try:
-        results = await database.fetch_all(query=query)
+        results = await readers.fetch_all(query=query)
         # Ensure default values for older records if any
         cameras = []
         for r in results:
@@ -84,8 +88,11 @@ async def list_cameras(current_user: dict = Depends(get_current_active_user)):
 async def delete_camera(camera_id: UUID, current_user: dict = Depends(get_current_active_user)):
     query = "DELETE FROM cameras WHERE id = :id"
     try:
-        await database.execute(query=query, values={"id": str(camera_id)})
+        await writer.execute(query=query, values={"id": str(camera_id)})
+        cache.bump("cameras")
         return {"message": "Camera deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
          # Log e
         raise HTTPException(status_code=500, detail="Failed to delete camera")
@@ -111,10 +118,13 @@ async def update_camera(camera_id: UUID, camera: CameraUpdate, current_user: dic
     values = {**update_data, "id": str(camera_id)}
     
     try:
-        await database.execute(query=query, values=values)
+        await writer.execute(query=query, values=values)
+        cache.bump("cameras")
         # Fetch updated record
         updated_camera = await database.fetch_one(query=check_query, values={"id": str(camera_id)})
         return dict(updated_camera)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error updating camera: {e}")
         raise HTTPException(status_code=500, detail="Failed to update camera")
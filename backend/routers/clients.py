@@ -3,8 +3,9 @@ from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
-from backend.database import database
+from backend.database import database, is_foreign_key_violation, readers, writer
 from backend.auth import get_current_active_user
+from backend import cache
 
 router = APIRouter(
     prefix="/clients",
@@ -56,8 +57,11 @@ async def create_client(client: ClientCreate, current_user: dict = Depends(get_c
     }
     
     try:
-        await database.execute(query=query, values=values)
+        await writer.execute(query=query, values=values)
+        cache.bump("clients")
         return {**values, "created_at": str(created_at)}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error creating client: {e}")
         raise HTTPException(status_code=500, detail="Failed to create client")
@@ -68,9 +72,13 @@ async def list_clients(current_user: dict = Depends(get_current_active_user)):
     List all clients.
     """
     query = "SELECT * FROM clients ORDER BY created_at DESC"
-    try:
-        results = await database.fetch_all(query=query)
+
+    async def load():
+        results = await readers.fetch_all(query=query)
         return [dict(r) for r in results]
+
+    try:
+        return await cache.cached("GET /clients/", ("clients",), load)
     except Exception as e:
         print(f"Error listing clients: {e}")
         return []
@@ -82,7 +90,7 @@ async def get_client(client_id: UUID, current_user: dict = Depends(get_current_a
     """
     query = "SELECT * FROM clients WHERE id = :id"
     try:
-        result = await database.fetch_one(query=query, values={"id": str(client_id)})
+        result = await readers.fetch_one(query=query, values={"id": str(client_id)})
         if not result:
             raise HTTPException(status_code=404, detail="Client not found")
         return dict(result)
@@ -110,9 +118,12 @@ async def update_client(client_id: UUID, client: ClientUpdate, current_user: dic
     values = {**update_data, "id": str(client_id)}
 
     try:
-        await database.execute(query=query, values=values)
+        await writer.execute(query=query, values=values)
+        cache.bump("clients")
         updated_client = await database.fetch_one(query=check_query, values={"id": str(client_id)})
         return dict(updated_client)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error updating client: {e}")
         raise HTTPException(status_code=500, detail="Failed to update client")
@@ -124,7 +135,12 @@ async def delete_client(client_id: UUID, current_user: dict = Depends(get_curren
     """
     query = "DELETE FROM clients WHERE id = :id"
     try:
-        await database.execute(query=query, values={"id": str(client_id)})
+        await writer.execute(query=query, values={"id": str(client_id)})
+        cache.bump("clients")
         return {"message": "Client deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=409, detail="Client has invoices and cannot be deleted")
         raise HTTPException(status_code=500, detail="Failed to delete client")
@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
-from backend.database import database
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from backend.database import database, execute_many, is_foreign_key_violation, readers, writer
+from backend.dialect import prefix_match
 from backend.auth import get_current_active_user
+from backend import cache, ledger
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, parse_cursor
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import date
 from uuid import UUID
+import asyncio
+import json
+import os
 import uuid
 
 router = APIRouter(prefix="/events", tags=["events"])
 
+# How long browsers, nginx and CDNs may reuse a client portal response
+PORTAL_CACHE_MAX_AGE = int(os.getenv("PORTAL_CACHE_MAX_AGE", 60))
+
+# Everything the client portal may show. Its responses sit in nginx and CDN
+# caches, so internal figures such as total_cost and net_profit stay out.
+PUBLIC_EVENT_FIELDS = ("id", "name", "event_date", "description", "base_price", "status")
+PUBLIC_INVOICE_FIELDS = ("id", "invoice_number", "total_amount", "status")
+
 class EventCreate(BaseModel):
     name: str
     event_date: date
@@ -27,24 +41,38 @@ class EventResponse(BaseModel):
     description: Optional[str]
     base_price: float
     status: str
+    total_cost: Optional[float] = None
+    net_profit: Optional[float] = None
+
+# Upper bound on ids per /events/financials call
+MAX_FINANCIALS_BATCH = 500
+# Widest window /events/calendar will serve
+MAX_CALENDAR_DAYS = 400
+# Cameras per /events/{id}/shutter call
+MAX_SHUTTER_BATCH = 50
 
 @router.post("/", response_model=dict)
 async def create_event(event: EventCreate, current_user: dict = Depends(get_current_active_user)):
     # SQLite compatible insert
     event_id = str(uuid.uuid4())
     query = """
-        INSERT INTO events (id, name, event_date, description, base_price, status)
-        VALUES (:id, :name, :event_date, :description, :base_price, 'planned')
+        INSERT INTO events (id, name, event_date, description, base_price, status, total_cost, net_profit)
+        VALUES (:id, :name, :event_date, :description, :base_price, 'planned', 0, :base_price)
     """
     try:
-        await database.execute(query=query, values={
-            "id": event_id,
-            "name": event.name,
-            "event_date": event.event_date,
-            "description": event.description,
-            "base_price": event.base_price
-        })
+        async with writer.transaction():
+            await database.execute(query=query, values={
+                "id": event_id,
+                "name": event.name,
+                "event_date": event.event_date,
+                "description": event.description,
+                "base_price": event.base_price
+            })
+            await ledger.record_event(event.event_date, event.base_price)
+        cache.bump("events")
         return {"id": event_id, "message": "Event created successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -56,16 +84,22 @@ async def add_event_cost(event_id: UUID, cost: EventCostCreate, current_user: di
         VALUES (:id, :event_id, :cost_type, :amount, :description)
     """
     try:
-        await database.execute(query=query, values={
-            "id": cost_id,
-            "event_id": str(event_id),
-            "cost_type": cost.cost_type,
-            "amount": cost.amount,
-            "description": cost.description
-        })
+        async with writer.transaction():
+            await database.execute(query=query, values={
+                "id": cost_id,
+                "event_id": str(event_id),
+                "cost_type": cost.cost_type,
+                "amount": cost.amount,
+                "description": cost.description
+            })
+            await ledger.record_event_cost(event_id, cost.amount)
+        cache.bump("events", "event_costs")
         return {"message": "Cost added successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        # Check for FK violation etc via e
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=404, detail="Event not found")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.patch("/{event_id}/financials")
@@ -74,58 +108,184 @@ async def update_event_financials(event_id: UUID, data: dict, current_user: dict
     if base_price is None:
          raise HTTPException(status_code=400, detail="Base price is required")
          
-    query = "UPDATE events SET base_price = :base_price WHERE id = :event_id"
+    query = """
+        UPDATE events
+        SET base_price = :base_price, net_profit = :base_price - COALESCE(total_cost, 0)
+        WHERE id = :event_id
+    """
     try:
-        await database.execute(query=query, values={"base_price": base_price, "event_id": str(event_id)})
+        async with writer.transaction():
+            existing = await database.fetch_one(
+                query="SELECT event_date, base_price FROM events WHERE id = :event_id",
+                values={"event_id": str(event_id)}
+            )
+            if not existing:
+                raise HTTPException(status_code=404, detail="Event not found")
+            await database.execute(query=query, values={"base_price": base_price, "event_id": str(event_id)})
+            await ledger.record_event_price_change(existing["event_date"], float(base_price) - (existing["base_price"] or 0.0))
+        cache.bump("events")
         return {"message": "Financials updated successfully", "base_price": base_price}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _financials(row) -> dict:
+    return {
+        "event_id": row["id"],
+        "total_revenue": row["base_price"] or 0.0,
+        "total_cost": row["total_cost"] or 0.0,
+        "net_profit": row["net_profit"] or 0.0
+    }
+
+@router.get("/financials")
+async def get_events_financials(ids: str, current_user: dict = Depends(get_current_active_user)):
+    """
+    Revenue, cost and profit for many events in one query (?ids=<id>,<id>,...).
+    """
+    try:
+        event_ids = [str(UUID(i.strip())) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of event ids")
+    if len(event_ids) > MAX_FINANCIALS_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FINANCIALS_BATCH} ids per request")
+    if not event_ids:
+        return []
+
+    params = {f"id{i}": event_id for i, event_id in enumerate(event_ids)}
+    query = f"""
+        SELECT id, base_price, total_cost, net_profit
+        FROM events
+        WHERE id IN ({', '.join(':' + k for k in params)})
+    """
+    results = await readers.fetch_all(query=query, values=params)
+    return [_financials(r) for r in results]
+
+@router.get("/calendar")
+async def get_calendar(
+    response: Response,
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Events between `from` and `to` inclusive, grouped by day: {date: [{id, name, status, price}]}.
+
+    Revalidates with an ETag tied to the events table version, so paging
+    back to a month the browser has already seen costs a 304.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (to_date - from_date).days >= MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Window may span at most {MAX_CALENDAR_DAYS} days")
+
+    tag = cache.etag(("events",), "calendar", from_date, to_date)
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+    if cache.etag_matches(if_none_match, tag):
+        return Response(status_code=304, headers=headers)
+
+    # Range scan on idx_events_event_date
+    query = """
+        SELECT event_date, id, name, status, base_price
+        FROM events
+        WHERE event_date >= :from_date AND event_date <= :to_date
+        ORDER BY event_date, id
+    """
+    results = await readers.fetch_all(query=query, values={
+        "from_date": from_date.isoformat(),
+        "to_date": to_date.isoformat()
+    })
+
+    days = {}
+    for r in results:
+        days.setdefault(str(r["event_date"]), []).append({
+            "id": r["id"],
+            "name": r["name"],
+            "status": r["status"],
+            "price": r["base_price"] or 0.0
+        })
+    response.headers.update(headers)
+    return days
+
 @router.get("/{event_id}/financials")
 async def get_event_financials(event_id: UUID, current_user: dict = Depends(get_current_active_user)):
-    # Manual calculation replacing SP
+    # Totals are maintained on the event row by backend/ledger.py
+    query = "SELECT id, base_price, total_cost, net_profit FROM events WHERE id = :event_id"
     try:
-        # Get Event for base price
-        event_query = "SELECT base_price FROM events WHERE id = :event_id"
-        event_res = await database.fetch_one(query=event_query, values={"event_id": str(event_id)})
-        
-        if not event_res:
-            raise HTTPException(status_code=404, detail="Event not found")
-            
-        base_price = event_res['base_price']
-        
-        # Get Sum of costs
-        cost_query = "SELECT SUM(amount) as total_cost FROM event_costs WHERE event_id = :event_id"
-        cost_res = await database.fetch_one(query=cost_query, values={"event_id": str(event_id)})
-        
-        total_cost = cost_res['total_cost'] or 0.0
-        net_profit = base_price - total_cost
-        
-        return {
-            "event_id": event_id,
-            "total_revenue": base_price,
-            "total_cost": total_cost,
-            "net_profit": net_profit
-        }
+        result = await readers.fetch_one(query=query, values={"event_id": str(event_id)})
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
 
+    if not result:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return _financials(result)
+
 @router.get("/", response_model=List[EventResponse])
-async def list_events(current_user: dict = Depends(get_current_active_user)):
-    query = "SELECT * FROM events ORDER BY event_date DESC"
-    try:
-        results = await database.fetch_all(query=query)
-        # Convert to list and handle UUID strings if needed (databases handles dict returns well)
+async def list_events(
+    response: Response,
+    status: Optional[str] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    name: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    One page of events, newest first. `name` matches a case-insensitive prefix.
+    """
+    cursor = parse_cursor(after)
+
+    conditions = []
+    values = {"limit": limit + 1}
+    if status:
+        conditions.append("status = :status")
+        values["status"] = status
+    if from_date:
+        conditions.append("event_date >= :from_date")
+        values["from_date"] = from_date.isoformat()
+    if to_date:
+        conditions.append("event_date <= :to_date")
+        values["to_date"] = to_date.isoformat()
+    if name:
+        # Wildcard travels in the value; '%' cannot appear in the SQL text here
+        conditions.append(prefix_match("name", "name"))
+        escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        values["name"] = escaped + "%"
+    if cursor:
+        conditions.append("(event_date < :after_date OR (event_date = :after_date AND id < :after_id))")
+        values["after_date"], values["after_id"] = cursor
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Served straight off idx_events_event_date / idx_events_status_date, no sort
+    query = f"""
+        SELECT * FROM events
+        {where}
+        ORDER BY event_date DESC, id DESC
+        LIMIT :limit
+    """
+
+    async def load():
+        results = await readers.fetch_all(query=query, values=values)
         return [dict(r) for r in results]
+
+    try:
+        # Cache the limit + 1 rows; the cursor header is set per response
+        rows = await cache.cached("GET /events/", ("events",), load, {
+            "status": status, "from": str(from_date), "to": str(to_date),
+            "name": name, "after": after, "limit": limit
+        })
     except Exception as e:
         print(f"Error listing events: {e}")
         return []
+    return paginate(rows, limit, response, key_field="event_date")
 
 @router.get("/{event_id}", response_model=EventResponse)
 async def get_event(event_id: UUID, current_user: dict = Depends(get_current_active_user)):
     query = "SELECT * FROM events WHERE id = :event_id"
     try:
-        result = await database.fetch_one(query=query, values={"event_id": str(event_id)})
+        result = await readers.fetch_one(query=query, values={"event_id": str(event_id)})
         if not result:
             raise HTTPException(status_code=404, detail="Event not found")
         return dict(result)
@@ -140,8 +300,11 @@ async def update_event_status(event_id: UUID, status_data: dict, current_user: d
         
     query = "UPDATE events SET status = :status WHERE id = :event_id"
     try:
-        await database.execute(query=query, values={"status": new_status, "event_id": str(event_id)})
+        await writer.execute(query=query, values={"status": new_status, "event_id": str(event_id)})
+        cache.bump("events")
         return {"message": "Status updated successfully", "status": new_status}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -149,87 +312,175 @@ async def update_event_status(event_id: UUID, status_data: dict, current_user: d
 async def delete_event(event_id: UUID, current_user: dict = Depends(get_current_active_user)):
     query = "DELETE FROM events WHERE id = :event_id"
     try:
-        await database.execute(query=query, values={"event_id": str(event_id)})
+        async with writer.transaction():
+            existing = await database.fetch_one(
+                query="SELECT event_date, base_price FROM events WHERE id = :event_id",
+                values={"event_id": str(event_id)}
+            )
+            if existing:
+                # Its costs drop out of the dashboard along with the event
+                costs = await database.fetch_one(
+                    query="SELECT SUM(amount) as total FROM event_costs WHERE event_id = :event_id",
+                    values={"event_id": str(event_id)}
+                )
+                await ledger.record_event_cost(event_id, -(costs["total"] or 0.0))
+                await ledger.record_event(existing["event_date"], existing["base_price"], sign=-1)
+            await database.execute(query=query, values={"event_id": str(event_id)})
+        cache.bump("events", "event_costs")
         return {"message": "Event deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=409, detail="Event has invoices; delete or detach them first")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/public/{event_id}", response_model=dict)
-async def get_public_event(event_id: UUID):
-    query = "SELECT * FROM events WHERE id = :event_id"
-    try:
-        # Get Event
-        result = await database.fetch_one(query=query, values={"event_id": str(event_id)})
+async def get_public_event(event_id: UUID, if_none_match: Optional[str] = Header(None)):
+    """
+    Client portal payload. Unauthenticated and shared widely, so the encoded
+    body is cached until the event or its invoices change, and the response
+    is marked cacheable by nginx and CDNs for PORTAL_CACHE_MAX_AGE seconds.
+    """
+    query = f"SELECT {', '.join(PUBLIC_EVENT_FIELDS)} FROM events WHERE id = :event_id"
+
+    invoice_query = f"SELECT {', '.join(PUBLIC_INVOICE_FIELDS)} FROM invoices WHERE event_id = :event_id AND status != 'DRAFT'"
+
+    async def load():
+        # Event and its invoices, read side by side
+        values = {"event_id": str(event_id)}
+        result, invoices = await asyncio.gather(
+            readers.fetch_one(query=query, values=values),
+            readers.fetch_all(query=invoice_query, values=values)
+        )
         if not result:
             raise HTTPException(status_code=404, detail="Event not found")
-        
-        event_data = dict(result)
 
-        # Get Invoices
-        invoice_query = "SELECT id, invoice_number, total_amount, status FROM invoices WHERE event_id = :event_id AND status != 'DRAFT'"
-        invoices = await database.fetch_all(query=invoice_query, values={"event_id": str(event_id)})
-        
-        event_data["invoices"] = [dict(inv) for inv in invoices]
-        
-        return event_data
+        # Built field by field so a wider query can never widen the cached body
+        event_data = {field: result[field] for field in PUBLIC_EVENT_FIELDS}
+        event_data["invoices"] = [{field: inv[field] for field in PUBLIC_INVOICE_FIELDS} for inv in invoices]
+
+        body = json.dumps(event_data, default=str).encode()
+        return body, cache.content_etag(body)
+
+    try:
+        body, tag = await cache.cached("GET /events/public", ("events", "invoices"), load, {"event_id": str(event_id)})
     except Exception as e:
         print(f"Error fetching public event: {e}")
         raise HTTPException(status_code=404, detail="Event not found")
 
-@router.post("/{event_id}/shutter")
-async def add_shutter_cost(event_id: UUID, data: dict, current_user: dict = Depends(get_current_active_user)):
-    camera_id = data.get("camera_id")
-    shutter_count = data.get("shutter_count")
-    
+    headers = {
+        "ETag": tag,
+        "Cache-Control": f"public, max-age={PORTAL_CACHE_MAX_AGE}, stale-while-revalidate={PORTAL_CACHE_MAX_AGE}"
+    }
+    if cache.etag_matches(if_none_match, tag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _shutter_item(item: dict) -> tuple:
+    camera_id = item.get("camera_id")
+    shutter_count = item.get("shutter_count")
+
     if not camera_id or not shutter_count:
         raise HTTPException(status_code=400, detail="Camera ID and Shutter Count are required")
-        
+
     try:
         shutter_count = int(shutter_count)
-    except ValueError:
+    except (TypeError, ValueError):
         raise HTTPException(status_code=400, detail="Shutter count must be an integer")
-        
-    # 1. Get Camera Details
-    camera_query = "SELECT * FROM cameras WHERE id = :id"
-    camera = await database.fetch_one(query=camera_query, values={"id": camera_id})
-    
-    if not camera:
-        raise HTTPException(status_code=404, detail="Camera not found")
-        
-    purchase_price = camera["purchase_price"] or 0.0
-    max_shutter_life = camera["max_shutter_life"] or 150000
-    model_name = camera["model_name"]
-    
-    # 2. Calculate Cost
-    if max_shutter_life > 0:
-        cost_per_shutter = purchase_price / max_shutter_life
-    else:
-        cost_per_shutter = 0.0
-        
-    total_cost = cost_per_shutter * shutter_count
-    
-    # 3. Update Camera Shutter Count
-    new_shutter_count = (camera["current_shutter_count"] or 0) + shutter_count
-    update_camera_query = "UPDATE cameras SET current_shutter_count = :count WHERE id = :id"
-    await database.execute(query=update_camera_query, values={"count": new_shutter_count, "id": camera_id})
-    
-    # 4. Add Event Cost
-    cost_id = str(uuid.uuid4())
+    if shutter_count <= 0:
+        raise HTTPException(status_code=400, detail="Shutter count must be positive")
+    return str(camera_id), shutter_count
+
+@router.post("/{event_id}/shutter")
+async def add_shutter_cost(event_id: UUID, data: dict, current_user: dict = Depends(get_current_active_user)):
+    """
+    Record shutter wear for one camera ({camera_id, shutter_count}) or several
+    ({"cameras": [{camera_id, shutter_count}, ...]}) in a single transaction.
+    """
+    items = data.get("cameras")
+    if items is None:
+        items = [data]
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="cameras must be a non-empty list")
+    if len(items) > MAX_SHUTTER_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SHUTTER_BATCH} cameras per request")
+    entries = [_shutter_item(item) for item in items]
+
+    # The increment happens in SQL, so concurrent submissions for the same
+    # body cannot overwrite each other's counts
+    update_camera_query = """
+        UPDATE cameras
+        SET current_shutter_count = COALESCE(current_shutter_count, 0) + :count
+        WHERE id = :id
+        RETURNING model_name, purchase_price, max_shutter_life, current_shutter_count
+    """
     insert_cost_query = """
         INSERT INTO event_costs (id, event_id, cost_type, amount, description)
         VALUES (:id, :event_id, 'Shutter Wear', :amount, :description)
     """
-    description = f"{shutter_count} shots with {model_name}"
-    
-    await database.execute(query=insert_cost_query, values={
-        "id": cost_id,
-        "event_id": str(event_id),
-        "amount": total_cost,
-        "description": description
-    })
-    
-    return {
+    insert_usage_query = """
+        INSERT INTO camera_usage (id, event_id, camera_id, shutter_count_used)
+        VALUES (:id, :event_id, :camera_id, :shutter_count_used)
+    """
+
+    costs = []
+    usage = []
+    results = []
+    async with writer.transaction():
+        event = await database.fetch_one(
+            query="SELECT id FROM events WHERE id = :event_id", values={"event_id": str(event_id)}
+        )
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+
+        for camera_id, shutter_count in entries:
+            # 1. Bump the counter and read back what the cost depends on
+            camera = await database.fetch_one(
+                query=update_camera_query, values={"count": shutter_count, "id": camera_id}
+            )
+            if not camera:
+                # Leaving the block rolls back the cameras already updated
+                raise HTTPException(status_code=404, detail=f"Camera {camera_id} not found")
+
+            # 2. Calculate Cost
+            purchase_price = camera["purchase_price"] or 0.0
+            max_shutter_life = camera["max_shutter_life"] or 150000
+            cost_per_shutter = purchase_price / max_shutter_life if max_shutter_life > 0 else 0.0
+            # Rounded to cents here, as the money columns store it, so the
+            # event total and rollup get exactly the sum of the stored costs
+            total_cost = round(cost_per_shutter * shutter_count, 2)
+
+            costs.append({
+                "id": str(uuid.uuid4()),
+                "event_id": str(event_id),
+                "amount": total_cost,
+                "description": f"{shutter_count} shots with {camera['model_name']}"
+            })
+            usage.append({
+                "id": str(uuid.uuid4()),
+                "event_id": str(event_id),
+                "camera_id": camera_id,
+                "shutter_count_used": shutter_count
+            })
+            results.append({
+                "camera_id": camera_id,
+                "cost": total_cost,
+                "new_shutter_count": camera["current_shutter_count"]
+            })
+
+        # 3. Event costs and usage history, one batch each
+        await execute_many(insert_cost_query, costs)
+        await execute_many(insert_usage_query, usage)
+        await ledger.record_event_cost(event_id, round(sum(c["amount"] for c in costs), 2))
+    cache.bump("cameras", "events", "event_costs")
+
+    total = round(sum(r["cost"] for r in results), 2)
+    response = {
         "message": "Shutter cost recorded successfully",
-        "cost": total_cost,
-        "new_shutter_count": new_shutter_count
+        "cost": total,
+        "cameras": results
     }
+    if len(results) == 1:
+        response["new_shutter_count"] = results[0]["new_shutter_count"]
+    return response
@@ -3,8 +3,10 @@ from pydantic import BaseModel
 from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
-from backend.database import database
+from backend.database import database, is_foreign_key_violation, readers, writer
 from backend.auth import get_current_active_user
+from backend import cache, ledger
+from backend.dialect import for_update
 
 router = APIRouter(
     prefix="/expenses",
@@ -47,9 +49,16 @@ async def create_expense(expense: ExpenseCreate, current_user: dict = Depends(ge
     }
     
     try:
-        await database.execute(query=query, values=values)
+        async with writer.transaction():
+            await database.execute(query=query, values=values)
+            await ledger.record_event_cost(expense.event_id, expense.amount)
+        cache.bump("events", "event_costs")
         return {**values, "created_at": str(datetime.now())}
+    except HTTPException:
+        raise
     except Exception as e:
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=404, detail="Event not found")
         print(f"Error creating expense: {e}")
         raise HTTPException(status_code=500, detail="Failed to create expense")
 
@@ -60,7 +69,7 @@ async def get_event_expenses(event_id: UUID, current_user: dict = Depends(get_cu
     """
     query = "SELECT * FROM event_costs WHERE event_id = :event_id ORDER BY created_at DESC"
     try:
-        results = await database.fetch_all(query=query, values={"event_id": str(event_id)})
+        results = await readers.fetch_all(query=query, values={"event_id": str(event_id)})
         return [dict(r) for r in results]
     except Exception as e:
         print(f"Error fetching expenses: {e}")
@@ -73,8 +82,17 @@ async def delete_expense(expense_id: UUID, current_user: dict = Depends(get_curr
     """
     query = "DELETE FROM event_costs WHERE id = :id"
     try:
-        await database.execute(query=query, values={"id": str(expense_id)})
+        async with writer.transaction():
+            existing = await database.fetch_one(
+                query="SELECT event_id, amount FROM event_costs WHERE id = :id" + for_update(), values={"id": str(expense_id)}
+            )
+            await database.execute(query=query, values={"id": str(expense_id)})
+            if existing:
+                await ledger.record_event_cost(existing["event_id"], -(existing["amount"] or 0.0))
+        cache.bump("events", "event_costs")
         return {"message": "Expense deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to delete expense")
 
@@ -88,24 +106,30 @@ async def update_expense(expense_id: UUID, expense: ExpenseUpdate, current_user:
     """
     Update an existing expense record.
     """
-    # 1. Check if expense exists
-    check_query = "SELECT * FROM event_costs WHERE id = :id"
-    existing = await database.fetch_one(query=check_query, values={"id": str(expense_id)})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Expense not found")
-
-    # 2. Build update query
     update_data = expense.model_dump(exclude_unset=True)
-    if not update_data:
-        return {"message": "No changes provided"}
-
     set_clause = ", ".join([f"{key} = :{key}" for key in update_data.keys()])
     query = f"UPDATE event_costs SET {set_clause} WHERE id = :id"
     values = {**update_data, "id": str(expense_id)}
 
     try:
-        await database.execute(query=query, values=values)
+        async with writer.transaction():
+            # 1. Check if expense exists; read inside the transaction so the
+            # cost delta is taken against the amount this update replaces
+            check_query = "SELECT * FROM event_costs WHERE id = :id" + for_update()
+            existing = await database.fetch_one(query=check_query, values={"id": str(expense_id)})
+            if not existing:
+                raise HTTPException(status_code=404, detail="Expense not found")
+
+            # 2. Apply the update
+            if not update_data:
+                return {"message": "No changes provided"}
+            await database.execute(query=query, values=values)
+            if update_data.get("amount") is not None:
+                await ledger.record_event_cost(existing["event_id"], update_data["amount"] - (existing["amount"] or 0.0))
+        cache.bump("events", "event_costs")
         return {"message": "Expense updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error updating expense: {e}")
         raise HTTPException(status_code=500, detail="Failed to update expense")
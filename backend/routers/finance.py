@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends
-from backend.database import database
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from backend.database import DIALECT, database, execute_many, readers, writer
+from backend.dialect import POSTGRES, to_date
 from backend.auth import get_current_active_user
+from backend import cache, ledger
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, parse_cursor
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import math
 
 router = APIRouter(
     prefix="/finance",
@@ -27,73 +37,203 @@ class TransactionCreate(BaseModel):
     amount: float
     description: Optional[str] = None
 
+# The ledger merges three sources. Each branch exposes the same columns, with
+# `date` normalised to an ISO date, and names the raw expression behind it so
+# filters and keyset comparisons can use the branch's own index.
+LEDGER_BRANCHES = {
+    "event": {
+        "date": "event_date",
+        "id": "id",
+        "select": """
+            SELECT id, event_date as date, 'Event: ' || name as description, 'Credit' as type,
+                   'Event Income' as category, base_price as amount, status, 'event' as source
+            FROM events
+        """,
+        "type": "'Credit'",
+        "category": "'Event Income'",
+    },
+    "expense": {
+        "date": to_date("c.created_at"),
+        "id": "c.id",
+        "select": f"""
+            SELECT c.id, {to_date('c.created_at')} as date, c.cost_type || ' - ' || e.name as description, 'Debit' as type,
+                   'Event Expense' as category, c.amount, 'completed' as status, 'expense' as source
+            FROM event_costs c
+            JOIN events e ON c.event_id = e.id
+        """,
+        "type": "'Debit'",
+        "category": "'Event Expense'",
+    },
+    "manual": {
+        "date": "date",
+        "id": "id",
+        "select": """
+            SELECT id, date, COALESCE(description, '') as description, type,
+                   category, amount, 'completed' as status, 'manual' as source
+            FROM transactions
+        """,
+        "type": "type",
+        "category": "category",
+    },
+}
+
+def _ledger_query(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    after: Optional[tuple] = None,
+    limit: Optional[int] = None,
+    ascending: bool = False
+) -> tuple:
+    """
+    Build the UNION ALL ledger query for the given filters.
+
+    With a limit, every branch is cut to `limit` rows before the merge, so a
+    page never reads more than 3 * limit rows whatever the size of the history.
+    """
+    values = {}
+    if from_date:
+        values["from_date"] = from_date.isoformat()
+    if to_date:
+        values["to_date"] = to_date.isoformat()
+    if type:
+        values["type"] = type
+    if category:
+        values["category"] = category
+    if after:
+        values["after_date"], values["after_id"] = after
+    if limit:
+        values["limit"] = limit
+
+    direction = "ASC" if ascending else "DESC"
+    cmp = ">" if ascending else "<"
+
+    branches = []
+    for name, branch in LEDGER_BRANCHES.items():
+        if source and source != name:
+            continue
+        date_col = branch["date"]
+        conditions = []
+        if from_date:
+            conditions.append(f"{date_col} >= :from_date")
+        if to_date:
+            conditions.append(f"{date_col} <= :to_date")
+        if type:
+            conditions.append(f"{branch['type']} = :type")
+        if category:
+            conditions.append(f"{branch['category']} = :category")
+        if after:
+            conditions.append(
+                f"({date_col} {cmp} :after_date OR ({date_col} = :after_date AND {branch['id']} {cmp} :after_id))"
+            )
+
+        sql = branch["select"]
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if limit:
+            sql = f"SELECT * FROM ({sql} ORDER BY {date_col} {direction}, {branch['id']} {direction} LIMIT :limit) {name}_page"
+        branches.append(sql)
+
+    if not branches:
+        raise HTTPException(status_code=400, detail=f"source must be one of: {', '.join(LEDGER_BRANCHES)}")
+
+    query = " UNION ALL ".join(branches) + f" ORDER BY date {direction}, id {direction}"
+    if limit:
+        query += " LIMIT :limit"
+    return query, values
+
 @router.get("/transactions", response_model=List[Transaction])
-async def get_transactions(current_user: dict = Depends(get_current_active_user)):
-    # 1. Get Income (Events)
-    events_query = """
-    SELECT id, event_date as date, name as description, base_price as amount, status 
-    FROM events 
-    ORDER BY event_date DESC
-    """
-    events = await database.fetch_all(query=events_query)
-    
-    # 2. Get Expenses (Debits)
-    # We need to join with events to get the date if not stored in expenses, 
-    # but for now let's use created_at as date for expenses or join event_id
-    expenses_query = """
-    SELECT c.id, c.created_at as date, c.cost_type || ' - ' || e.name as description, c.amount, 'completed' as status
-    FROM event_costs c
-    JOIN events e ON c.event_id = e.id
-    ORDER BY c.created_at DESC
-    """
-    expenses = await database.fetch_all(query=expenses_query)
-
-    # 3. Get General Transactions
-    transactions_query = "SELECT * FROM transactions ORDER BY date DESC"
-    general_transactions = await database.fetch_all(query=transactions_query)
-    
-    transactions = []
-    
-    for e in events:
-        transactions.append({
-            "id": str(e["id"]),
-            "date": str(e["date"]),
-            "description": f"Event: {e['description']}",
-            "type": "Credit",
-            "category": "Event Income",
-            "amount": e["amount"],
-            "status": e["status"],
-            "source": "event"
-        })
-        
-    for ex in expenses:
-        transactions.append({
-            "id": str(ex["id"]),
-            "date": str(ex["date"]),
-            "description": ex["description"],
-            "type": "Debit",
-            "category": "Event Expense",
-            "amount": ex["amount"],
-            "status": ex["status"],
-            "source": "expense"
-        })
-
-    for t in general_transactions:
-        transactions.append({
-            "id": str(t["id"]),
-            "date": str(t["date"]),
-            "description": f"{t['description'] or ''}",
-            "type": t["type"],
-            "category": t["category"],
-            "amount": t["amount"],
-            "status": "completed",
-            "source": "manual"
-        })
-        
-    # Sort by date desc
-    transactions.sort(key=lambda x: str(x["date"]), reverse=True)
-    
-    return transactions
+async def get_transactions(
+    response: Response,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    One page of the merged ledger (events, event costs and manual transactions), newest first.
+    """
+    # One extra row tells us whether another page follows
+    query, values = _ledger_query(
+        from_date, to_date, type, category, source,
+        after=parse_cursor(after), limit=limit + 1
+    )
+    results = await readers.fetch_all(query=query, values=values)
+    return paginate([dict(r) for r in results], limit, response, key_field="date")
+
+EXPORT_COLUMNS = ["date", "id", "description", "type", "category", "amount", "status", "source"]
+
+# Rows are buffered into chunks of roughly this size before being sent
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+@router.get("/export")
+async def export_transactions(
+    format: str = "csv",
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Stream the ledger oldest first as CSV or NDJSON.
+    """
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+
+    # Every branch is read in index order and merged, so rows flow without a sort
+    query, values = _ledger_query(from_date, to_date, ascending=True)
+
+    async def stream():
+        buffer = io.StringIO()
+        if format == "csv":
+            csv_writer = csv.writer(buffer)
+            csv_writer.writerow(EXPORT_COLUMNS)
+            # Send the header straight away so the download starts immediately
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        async for r in database.iterate(query=query, values=values):
+            if format == "csv":
+                csv_writer.writerow([r[col] for col in EXPORT_COLUMNS])
+            else:
+                buffer.write(json.dumps({col: r[col] for col in EXPORT_COLUMNS}) + "\n")
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    period = f"{from_date or 'start'}_{to_date or 'today'}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=ledger_{period}.{format}"}
+    )
+
+@router.get("/summary")
+async def get_finance_summary(current_user: dict = Depends(get_current_active_user)):
+    """
+    All-time credit and debit totals across the ledger.
+    """
+    # monthly_rollups already holds the ledger's totals per month
+    query = "SELECT SUM(revenue) as credit, SUM(expenses) as debit FROM monthly_rollups"
+    totals = await readers.fetch_one(query=query)
+    total_credit = totals["credit"] or 0.0
+    total_debit = totals["debit"] or 0.0
+    return {
+        "total_credit": total_credit,
+        "total_debit": total_debit,
+        "net_profit": total_credit - total_debit
+    }
 
 from uuid import uuid4
 
@@ -113,11 +253,15 @@ async def create_transaction(transaction: TransactionCreate, current_user: dict
     }
     
     try:
-        await database.execute(query=query, values=values)
+        async with writer.transaction():
+            await database.execute(query=query, values=values)
+            await ledger.record_transaction(transaction.date, transaction.type, transaction.amount)
+        cache.bump("transactions")
         return {"message": "Transaction added successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error adding transaction: {e}")
-        from fastapi import HTTPException
         raise HTTPException(status_code=500, detail="Failed to add transaction")
 
 @router.put("/transaction/{transaction_id}")
@@ -137,20 +281,181 @@ async def update_transaction(transaction_id: str, transaction: TransactionCreate
     }
     
     try:
-        await database.execute(query=query, values=values)
+        async with writer.transaction():
+            existing = await database.fetch_one(
+                query="SELECT date, type, amount FROM transactions WHERE id = :id", values={"id": transaction_id}
+            )
+            await database.execute(query=query, values=values)
+            if existing:
+                await ledger.record_transaction(existing["date"], existing["type"], existing["amount"], sign=-1)
+                await ledger.record_transaction(transaction.date, transaction.type, transaction.amount)
+        cache.bump("transactions")
         return {"message": "Transaction updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error updating transaction: {e}")
-        from fastapi import HTTPException
         raise HTTPException(status_code=500, detail="Failed to update transaction")
 
 @router.delete("/transaction/{transaction_id}")
 async def delete_transaction(transaction_id: str, current_user: dict = Depends(get_current_active_user)):
     query = "DELETE FROM transactions WHERE id = :id"
     try:
-        await database.execute(query=query, values={"id": transaction_id})
+        async with writer.transaction():
+            existing = await database.fetch_one(
+                query="SELECT date, type, amount FROM transactions WHERE id = :id", values={"id": transaction_id}
+            )
+            await database.execute(query=query, values={"id": transaction_id})
+            if existing:
+                await ledger.record_transaction(existing["date"], existing["type"], existing["amount"], sign=-1)
+        cache.bump("transactions")
         return {"message": "Transaction deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error deleting transaction: {e}")
-        from fastapi import HTTPException
         raise HTTPException(status_code=500, detail="Failed to delete transaction")
+
+IMPORT_COLUMNS = ("date", "type", "category", "amount", "description")
+
+# Hash lookups against existing rows are batched to stay under SQLite's bound-variable limit
+IMPORT_HASH_BATCH = 500
+# Tried in order; bank exports that are not UTF-8 are usually Windows-1252
+IMPORT_ENCODINGS = ("utf-8-sig", "cp1252")
+# Postgres advisory lock that serializes imports' duplicate check and insert
+IMPORT_LOCK_KEY = 0x1F0A7
+
+def _parse_import_row(row: dict) -> dict:
+    """
+    Validate one statement line and return it in transactions' column format.
+    """
+    tx_date = date.fromisoformat((row.get("date") or "").strip()).isoformat()
+    tx_type = (row.get("type") or "").strip().capitalize()
+    if tx_type not in ("Credit", "Debit"):
+        raise ValueError("type must be Credit or Debit")
+    amount = round(float((row.get("amount") or "").strip()), 2)
+    if not math.isfinite(amount):
+        raise ValueError("amount must be a number")
+    if amount <= 0:
+        raise ValueError("amount must be positive")
+    # Postgres text cannot hold NUL, and it usually means a binary file was uploaded
+    if any("\x00" in (row.get(col) or "") for col in IMPORT_COLUMNS):
+        raise ValueError("line contains a NUL character")
+    return {
+        "date": tx_date,
+        "type": tx_type,
+        "category": (row.get("category") or "").strip() or "Other",
+        "amount": amount,
+        "description": (row.get("description") or "").strip() or None
+    }
+
+def _parse_statement(raw_file, encoding: str) -> tuple:
+    """
+    Validate and hash every line of the upload. Returns (report, pending), where
+    pending pairs each valid row's report entry with the row to insert.
+    """
+    text = io.TextIOWrapper(raw_file, encoding=encoding, newline="")
+    reader = csv.DictReader(text)
+    try:
+        if not reader.fieldnames or not {"date", "type", "amount"} <= {f.strip().lower() for f in reader.fieldnames}:
+            raise HTTPException(status_code=400, detail=f"CSV header must include: {', '.join(IMPORT_COLUMNS)}")
+
+        report = []
+        pending = []
+        occurrences = {}
+        for line_no, raw in enumerate(reader, start=2):
+            row = {(k or "").strip().lower(): v for k, v in raw.items()}
+            try:
+                parsed = _parse_import_row(row)
+            except (ValueError, TypeError) as e:
+                report.append({"row": line_no, "status": "error", "detail": str(e)})
+                continue
+
+            fingerprint = "|".join(str(parsed[col] or "") for col in IMPORT_COLUMNS)
+            occurrences[fingerprint] = occurrences.get(fingerprint, 0) + 1
+            parsed["content_hash"] = hashlib.sha256(f"{fingerprint}|{occurrences[fingerprint]}".encode("utf-8")).hexdigest()
+            parsed["id"] = str(uuid4())
+            entry = {"row": line_no, "status": "imported", "id": parsed["id"]}
+            report.append(entry)
+            pending.append((entry, parsed))
+        return report, pending
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Malformed CSV after line {reader.line_num}: {e}")
+    finally:
+        # Closing the wrapper would close the upload, which a retry in another encoding reads again
+        text.detach()
+
+def _read_statement(raw_file) -> tuple:
+    """
+    _parse_statement in the first of IMPORT_ENCODINGS the upload decodes in.
+    """
+    for encoding in IMPORT_ENCODINGS:
+        raw_file.seek(0)
+        try:
+            return _parse_statement(raw_file, encoding)
+        except UnicodeDecodeError:
+            continue
+    raise HTTPException(status_code=400, detail=f"File is not text in any of: {', '.join(IMPORT_ENCODINGS)}")
+
+@router.post("/import")
+async def import_transactions(file: UploadFile = File(...), current_user: dict = Depends(get_current_active_user)):
+    """
+    Import a CSV bank statement (date,type,category,amount,description) in one transaction.
+
+    Each row gets a content hash of its fields plus how many identical rows came
+    before it in the file, so re-importing a statement skips everything it
+    already added while two genuinely identical lines both still land.
+    """
+    # 1. Validate and hash in a single pass over the upload, off the event loop:
+    # a large statement is seconds of file reads, CSV parsing and sha256
+    report, pending = await asyncio.to_thread(_read_statement, file.file)
+
+    query = """
+    INSERT INTO transactions (id, date, type, category, amount, description, content_hash)
+    VALUES (:id, :date, :type, :category, :amount, :description, :content_hash)
+    """
+    try:
+        async with writer.transaction():
+            # 2. Drop rows a previous import already added. Checked inside the
+            # write so two uploads of the same statement cannot both pass it;
+            # SQLite's writer queue serializes them, Postgres needs the lock.
+            if DIALECT == POSTGRES:
+                await database.execute(query="SELECT pg_advisory_xact_lock(:key)", values={"key": IMPORT_LOCK_KEY})
+            existing = set()
+            hashes = [parsed["content_hash"] for _, parsed in pending]
+            for i in range(0, len(hashes), IMPORT_HASH_BATCH):
+                batch = hashes[i:i + IMPORT_HASH_BATCH]
+                params = {f"h{j}": h for j, h in enumerate(batch)}
+                hash_query = f"SELECT content_hash FROM transactions WHERE content_hash IN ({', '.join(':' + k for k in params)})"
+                existing.update(r["content_hash"] for r in await database.fetch_all(query=hash_query, values=params))
+
+            rows = []
+            for entry, parsed in pending:
+                if parsed["content_hash"] in existing:
+                    entry["status"] = "duplicate"
+                    del entry["id"]
+                else:
+                    rows.append(parsed)
+
+            # 3. Insert everything and the matching rollup deltas together
+            totals = {}
+            for r in rows:
+                key = (ledger.month_of(r["date"]), r["type"])
+                totals[key] = totals.get(key, 0.0) + r["amount"]
+            await execute_many(query, rows)
+            for (month, tx_type), amount in totals.items():
+                await ledger.record_transaction(month, tx_type, amount)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error importing transactions: {e}")
+        raise HTTPException(status_code=500, detail="Failed to import transactions")
+    if rows:
+        cache.bump("transactions")
+
+    return {
+        "imported": len(rows),
+        "duplicates": len(pending) - len(rows),
+        "errors": sum(1 for entry in report if entry["status"] == "error"),
+        "rows": report
+    }
@@ -1,16 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from uuid import UUID, uuid4
-from datetime import date, datetime
-from backend.database import database
+from datetime import date, datetime, timedelta
+from backend.database import DIALECT, database, execute_many, readers, writer
+from backend.dialect import json_object_array
 from backend.auth import get_current_active_user
-import io
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from backend import cache, pdf
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, parse_cursor
+import asyncio
+import json
+import zipfile
 
 router = APIRouter(
     prefix="/invoices",
@@ -37,6 +38,78 @@ class InvoiceUpdate(BaseModel):
     status: Optional[str] = None
     notes: Optional[str] = None
     due_date: Optional[date] = None
+    # When present, replaces every existing line and the total
+    items: Optional[List[InvoiceItemCreate]] = None
+
+class InvoiceItem(BaseModel):
+    id: str
+    invoice_id: str
+    description: str
+    quantity: Optional[int] = 1
+    unit_price: Optional[float] = 0.0
+    amount: Optional[float] = 0.0
+
+class InvoiceDetail(BaseModel):
+    invoice: dict  # invoices row plus client_name, client_email, client_phone
+    items: List[InvoiceItem]
+
+INSERT_ITEM_QUERY = """
+INSERT INTO invoice_items (id, invoice_id, position, description, quantity, unit_price, amount)
+VALUES (:id, :invoice_id, :position, :description, :quantity, :unit_price, :amount)
+"""
+
+async def insert_items(invoice_id: str, items: List[InvoiceItemCreate]):
+    """
+    Write all of an invoice's lines in one batch. Call inside writer.transaction().
+    """
+    await execute_many(INSERT_ITEM_QUERY, [{
+        "id": str(uuid4()),
+        "invoice_id": invoice_id,
+        "position": position,
+        "description": item.description,
+        "quantity": item.quantity,
+        "unit_price": item.unit_price,
+        "amount": item.amount
+    } for position, item in enumerate(items)])
+
+# Sent but not yet paid; the only status that can be overdue
+OUTSTANDING_STATUS = "SENT"
+
+# Receivables aging columns, by days past due_date
+AGING_BUCKETS = ("current", "days_1_30", "days_31_60", "days_61_90", "days_90_plus")
+
+# Invoice, client and items in one statement; the items arrive as a JSON array
+_ITEM_FIELDS = ("id", "invoice_id", "description", "quantity", "unit_price", "amount")
+# Lines written before the position column all have position 0; on SQLite
+# rowid still keeps those in insertion order
+ITEM_ORDER = "ii.position" if DIALECT == "postgresql" else "ii.position, ii.rowid"
+_ITEMS_JSON = json_object_array("ii", _ITEM_FIELDS, "FROM invoice_items ii WHERE ii.invoice_id = i.id", ITEM_ORDER)
+
+INVOICE_DETAIL_QUERY = f"""
+SELECT i.*, c.name as client_name, c.email as client_email, c.phone as client_phone,
+       {_ITEMS_JSON} as items_json
+FROM invoices i
+LEFT JOIN clients c ON i.client_id = c.id
+WHERE i.id = :id
+"""
+
+async def fetch_invoice_detail(invoice_id: str) -> Optional[InvoiceDetail]:
+    """
+    An invoice with its client details and items in one round trip, cached per invoice.
+    """
+    async def load():
+        row = await readers.fetch_one(query=INVOICE_DETAIL_QUERY, values={"id": invoice_id})
+        if not row:
+            return None
+        invoice = dict(row)
+        items = invoice.pop("items_json")
+        if isinstance(items, str):
+            items = json.loads(items)
+        return InvoiceDetail(invoice=invoice, items=items)
+
+    return await cache.cached(
+        "invoice detail", ("invoices", "invoice_items", "clients"), load, {"id": invoice_id}
+    )
 
 # --- Endpoints ---
 
@@ -69,161 +142,374 @@ async def create_invoice(invoice: InvoiceCreate, current_user: dict = Depends(ge
     }
     
     try:
-        await database.execute(query=query_invoice, values=values_invoice)
-        
-        # 2. Insert Items
-        if invoice.items:
-            query_item = """
-            INSERT INTO invoice_items (id, invoice_id, description, quantity, unit_price, amount)
-            VALUES (:id, :invoice_id, :description, :quantity, :unit_price, :amount)
-            """
-            for item in invoice.items:
-                await database.execute(query=query_item, values={
-                    "id": str(uuid4()),
-                    "invoice_id": invoice_id,
-                    "description": item.description,
-                    "quantity": item.quantity,
-                    "unit_price": item.unit_price,
-                    "amount": item.amount
-                })
-                
+        # Header and items commit together or not at all
+        async with writer.transaction():
+            await database.execute(query=query_invoice, values=values_invoice)
+
+            # 2. Insert Items
+            await insert_items(invoice_id, invoice.items)
+
+        cache.bump("invoices", "invoice_items")
         return {"id": invoice_id, "message": "Invoice created successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error creating invoice: {e}")
         raise HTTPException(status_code=500, detail="Failed to create invoice")
 
 @router.get("/")
-async def list_invoices(current_user: dict = Depends(get_current_active_user)):
+async def list_invoices(
+    response: Response,
+    status: Optional[str] = None,
+    client_id: Optional[UUID] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    overdue: bool = False,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_active_user)
+):
     """
-    List all invoices with client names.
+    One page of invoices with client names, newest first.
+
+    `from`/`to` bound the issued date; `overdue` keeps outstanding invoices past their due date.
     """
-    query = """
+    cursor = parse_cursor(after)
+    today = date.today()
+
+    conditions = []
+    values = {"limit": limit + 1}
+    if status:
+        conditions.append("i.status = :status")
+        values["status"] = status
+    if client_id:
+        conditions.append("i.client_id = :client_id")
+        values["client_id"] = str(client_id)
+    if from_date:
+        conditions.append("i.issued_date >= :from_date")
+        values["from_date"] = from_date.isoformat()
+    if to_date:
+        conditions.append("i.issued_date <= :to_date")
+        values["to_date"] = to_date.isoformat()
+    if overdue:
+        conditions.append("i.status = :outstanding AND i.due_date < :today")
+        values["outstanding"] = OUTSTANDING_STATUS
+        values["today"] = today.isoformat()
+    if cursor:
+        conditions.append("(i.created_at < :after_created OR (i.created_at = :after_created AND i.id < :after_id))")
+        values["after_created"], values["after_id"] = cursor
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
     SELECT i.*, c.name as client_name 
     FROM invoices i
     LEFT JOIN clients c ON i.client_id = c.id
-    ORDER BY i.created_at DESC
+    {where}
+    ORDER BY i.created_at DESC, i.id DESC
+    LIMIT :limit
     """
-    try:
-        results = await database.fetch_all(query=query)
+
+    async def load():
+        results = await readers.fetch_all(query=query, values=values)
         return [dict(r) for r in results]
+
+    try:
+        rows = await cache.cached("GET /invoices/", ("invoices", "clients"), load, {
+            "status": status, "client_id": str(client_id), "from": str(from_date), "to": str(to_date),
+            # Overdue-ness moves with the calendar, not just with writes
+            "overdue": today.isoformat() if overdue else None,
+            "after": after, "limit": limit
+        })
     except Exception as e:
         print(f"Error listing invoices: {e}")
         return []
+    return paginate(rows, limit, response, key_field="created_at")
 
-@router.get("/{invoice_id}")
-async def get_invoice(invoice_id: UUID, current_user: dict = Depends(get_current_active_user)):
+@router.get("/aging")
+async def get_receivables_aging(current_user: dict = Depends(get_current_active_user)):
     """
-    Get invoice details including items and client info.
+    Outstanding amounts per client bucketed by days past due, plus the totals.
     """
-    # 1. Get Invoice & Client
-    query_invoice = """
-    SELECT i.*, c.name as client_name, c.email as client_email, c.phone as client_phone, c.address as client_address
+    today = date.today()
+    # Bucket edges are plain dates so the CASEs compare due_date directly
+    values = {
+        "status": OUTSTANDING_STATUS,
+        "today": today.isoformat(),
+        "d30": (today - timedelta(days=30)).isoformat(),
+        "d60": (today - timedelta(days=60)).isoformat(),
+        "d90": (today - timedelta(days=90)).isoformat()
+    }
+    # Reads only idx_invoices_status_due, which covers every column used from invoices
+    query = """
+    SELECT i.client_id, c.name as client_name,
+           SUM(CASE WHEN i.due_date IS NULL OR i.due_date >= :today THEN i.total_amount ELSE 0 END) as current,
+           SUM(CASE WHEN i.due_date < :today AND i.due_date >= :d30 THEN i.total_amount ELSE 0 END) as days_1_30,
+           SUM(CASE WHEN i.due_date < :d30 AND i.due_date >= :d60 THEN i.total_amount ELSE 0 END) as days_31_60,
+           SUM(CASE WHEN i.due_date < :d60 AND i.due_date >= :d90 THEN i.total_amount ELSE 0 END) as days_61_90,
+           SUM(CASE WHEN i.due_date < :d90 THEN i.total_amount ELSE 0 END) as days_90_plus,
+           SUM(i.total_amount) as total,
+           COUNT(*) as invoice_count
     FROM invoices i
     LEFT JOIN clients c ON i.client_id = c.id
-    WHERE i.id = :id
+    WHERE i.status = :status
+    GROUP BY i.client_id, c.name
+    ORDER BY total DESC
     """
-    invoice = await database.fetch_one(query=query_invoice, values={"id": str(invoice_id)})
-    
-    if not invoice:
+
+    async def load():
+        results = await readers.fetch_all(query=query, values=values)
+        clients = []
+        totals = {bucket: 0.0 for bucket in AGING_BUCKETS}
+        totals.update({"total": 0.0, "invoice_count": 0})
+        for r in results:
+            row = dict(r)
+            for field in (*AGING_BUCKETS, "total"):
+                row[field] = round(row[field] or 0.0, 2)
+                totals[field] += row[field]
+            totals["invoice_count"] += row["invoice_count"]
+            clients.append(row)
+        return {
+            "as_of": today.isoformat(),
+            "buckets": list(AGING_BUCKETS),
+            "clients": clients,
+            "total": {k: round(v, 2) if isinstance(v, float) else v for k, v in totals.items()}
+        }
+
+    return await cache.cached("GET /invoices/aging", ("invoices", "clients"), load, {"today": today.isoformat()})
+
+# Invoices read from the database per round of the export
+EXPORT_BATCH_SIZE = 100
+
+class _ZipStream:
+    """
+    Write-only sink for zipfile; the export drains it after every member.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+async def _export_page(conditions: List[str], values: dict, order_by: str) -> List[tuple]:
+    """
+    One batch of (invoice, items) pairs matching `conditions`, in `order_by` order.
+    """
+    # Same columns as INVOICE_DETAIL_QUERY so renders share cache keys
+    query = f"""
+    SELECT i.*, c.name as client_name, c.email as client_email, c.phone as client_phone
+    FROM invoices i
+    LEFT JOIN clients c ON i.client_id = c.id
+    WHERE {' AND '.join(conditions)}
+    ORDER BY {order_by}
+    LIMIT :limit
+    """
+    invoices = [dict(r) for r in await readers.fetch_all(query=query, values={**values, "limit": EXPORT_BATCH_SIZE})]
+    if not invoices:
+        return []
+
+    ids = {f"id{n}": inv["id"] for n, inv in enumerate(invoices)}
+    items_query = f"""
+    SELECT * FROM invoice_items ii
+    WHERE ii.invoice_id IN ({', '.join(':' + k for k in ids)})
+    ORDER BY ii.invoice_id, {ITEM_ORDER}
+    """
+    items = {}
+    for r in await readers.fetch_all(query=items_query, values=ids):
+        items.setdefault(r["invoice_id"], []).append(InvoiceItem(**dict(r)).model_dump())
+    return [(invoice, items.get(invoice["id"], [])) for invoice in invoices]
+
+async def _export_batches(from_date: Optional[date], to_date: Optional[date], status: Optional[str]):
+    """
+    Yield (invoice, items) pairs in issued order, undated invoices last,
+    EXPORT_BATCH_SIZE invoices per query.
+    """
+    conditions = []
+    values = {}
+    if from_date:
+        conditions.append("i.issued_date >= :from_date")
+        values["from_date"] = from_date.isoformat()
+    if to_date:
+        conditions.append("i.issued_date <= :to_date")
+        values["to_date"] = to_date.isoformat()
+    if status:
+        conditions.append("i.status = :status")
+        values["status"] = status
+
+    # 1. Dated invoices, keyset-paged along idx_invoices_issued_date
+    after = None
+    while True:
+        page_conditions = conditions + ["i.issued_date IS NOT NULL"]
+        page_values = dict(values)
+        if after:
+            page_conditions.append("(i.issued_date > :after_date OR (i.issued_date = :after_date AND i.id > :after_id))")
+            page_values["after_date"], page_values["after_id"] = after
+        batch = await _export_page(page_conditions, page_values, "i.issued_date, i.id")
+        for pair in batch:
+            yield pair
+        if len(batch) < EXPORT_BATCH_SIZE:
+            break
+        last = batch[-1][0]
+        after = (last["issued_date"], last["id"])
+
+    # 2. Undated invoices, which no date range matches, paged on id alone
+    if from_date or to_date:
+        return
+    after_id = None
+    while True:
+        page_conditions = conditions + ["i.issued_date IS NULL"]
+        page_values = dict(values)
+        if after_id:
+            page_conditions.append("i.id > :after_id")
+            page_values["after_id"] = after_id
+        batch = await _export_page(page_conditions, page_values, "i.id")
+        for pair in batch:
+            yield pair
+        if len(batch) < EXPORT_BATCH_SIZE:
+            return
+        after_id = batch[-1][0]["id"]
+
+async def _export_render(invoice: dict, items: List[dict]) -> tuple:
+    key = pdf.render_key(invoice, items)
+    while True:
+        try:
+            path = await pdf.render_cached(key, invoice, items)
+            break
+        except HTTPException as e:
+            # Headers are already sent; wait for room in the queue instead of failing
+            if e.status_code != 503:
+                raise
+            await asyncio.sleep(1)
+    name = f"invoice_{str(invoice['invoice_number']).replace('/', '-')}.pdf"
+    return name, path
+
+@router.get("/export.zip")
+async def export_invoice_pdfs(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    status: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Stream every matching invoice's PDF as one ZIP.
+
+    At most PDF_WORKERS renders are outstanding and each file is written out
+    as soon as it is ready, so memory does not grow with the invoice count.
+    """
+    if pdf.saturated():
+        raise pdf.busy_error()
+
+    async def stream():
+        sink = _ZipStream()
+        pending = set()
+        try:
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+                async def write_finished(wait_for_all: bool):
+                    nonlocal pending
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.ALL_COMPLETED if wait_for_all else asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        name, path = task.result()
+                        await asyncio.to_thread(zf.write, path, name)
+
+                async for invoice, items in _export_batches(from_date, to_date, status):
+                    pending.add(asyncio.create_task(_export_render(invoice, items)))
+                    if len(pending) >= pdf.PDF_WORKERS:
+                        await write_finished(wait_for_all=False)
+                        yield sink.drain()
+                if pending:
+                    await write_finished(wait_for_all=True)
+            # Closing the archive writes the central directory
+            yield sink.drain()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=invoices.zip"}
+    )
+
+@router.get("/{invoice_id}")
+async def get_invoice(invoice_id: UUID, current_user: dict = Depends(get_current_active_user)):
+    """
+    Get invoice details including items and client info.
+    """
+    detail = await fetch_invoice_detail(str(invoice_id))
+    if not detail:
         raise HTTPException(status_code=404, detail="Invoice not found")
-        
-    # 2. Get Items
-    query_items = "SELECT * FROM invoice_items WHERE invoice_id = :invoice_id"
-    items = await database.fetch_all(query=query_items, values={"invoice_id": str(invoice_id)})
-    
-    return {
-        "invoice": dict(invoice),
-        "items": [dict(item) for item in items]
-    }
+    return detail.model_dump()
 
 @router.put("/{invoice_id}")
 async def update_invoice(invoice_id: UUID, invoice: InvoiceUpdate, current_user: dict = Depends(get_current_active_user)):
     """
-    Update invoice status or details.
+    Update invoice status or details, optionally replacing its items.
     """
-    update_data = invoice.model_dump(exclude_unset=True)
+    update_data = invoice.model_dump(exclude_unset=True, exclude={"items"})
+    items = invoice.items
+    if items is not None:
+        update_data["total_amount"] = sum(item.amount for item in items)
     if not update_data:
         return {"message": "No changes provided"}
 
     set_clause = ", ".join([f"{key} = :{key}" for key in update_data.keys()])
-    query = f"UPDATE invoices SET {set_clause} WHERE id = :id"
+    query = f"UPDATE invoices SET {set_clause} WHERE id = :id RETURNING id"
     values = {**update_data, "id": str(invoice_id)}
 
     try:
-        await database.execute(query=query, values=values)
+        async with writer.transaction():
+            updated = await database.fetch_one(query=query, values=values)
+            if not updated:
+                raise HTTPException(status_code=404, detail="Invoice not found")
+            if items is not None:
+                await database.execute(
+                    query="DELETE FROM invoice_items WHERE invoice_id = :id", values={"id": str(invoice_id)}
+                )
+                await insert_items(str(invoice_id), items)
+        if items is not None:
+            cache.bump("invoices", "invoice_items")
+        else:
+            cache.bump("invoices")
         return {"message": "Invoice updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
+        print(f"Error updating invoice: {e}")
         raise HTTPException(status_code=500, detail="Failed to update invoice")
 
 @router.get("/{invoice_id}/pdf")
-async def generate_invoice_pdf(invoice_id: UUID):
+async def generate_invoice_pdf(invoice_id: UUID, if_none_match: Optional[str] = Header(None)):
     """
-    Generate PDF for the invoice.
+    Generate PDF for the invoice, served from the render cache when unchanged.
     """
-    # Fetch Data
-    query_invoice = """
-    SELECT i.*, c.name as client_name, c.email as client_email, c.address as client_address
-    FROM invoices i
-    LEFT JOIN clients c ON i.client_id = c.id
-    WHERE i.id = :id
-    """
-    invoice = await database.fetch_one(query=query_invoice, values={"id": str(invoice_id)})
-    
-    if not invoice:
+    detail = await fetch_invoice_detail(str(invoice_id))
+    if not detail:
         raise HTTPException(status_code=404, detail="Invoice not found")
-        
-    query_items = "SELECT * FROM invoice_items WHERE invoice_id = :invoice_id"
-    items = await database.fetch_all(query=query_items, values={"invoice_id": str(invoice_id)})
-    
-    # Generate PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Header
-    elements.append(Paragraph("INVOICE", styles['Title']))
-    elements.append(Spacer(1, 12))
-    
-    # Info
-    elements.append(Paragraph(f"<b>Invoice #:</b> {invoice['invoice_number']}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Date:</b> {invoice['issued_date']}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Client:</b> {invoice['client_name']}", styles['Normal']))
-    elements.append(Spacer(1, 24))
-    
-    # Table Data
-    data = [['Description', 'Qty', 'Unit Price', 'Amount']]
-    for item in items:
-        data.append([
-            item['description'],
-            str(item['quantity']),
-            f"RM {item['unit_price']:.2f}",
-            f"RM {item['amount']:.2f}"
-        ])
-    
-    # Total
-    data.append(['', '', 'Total:', f"RM {invoice['total_amount']:.2f}"])
-    
-    # Table Style
-    table = Table(data, colWidths=[300, 50, 100, 100])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    
-    elements.append(table)
-    
-    # Footer Notes
-    if invoice['notes']:
-        elements.append(Spacer(1, 24))
-        elements.append(Paragraph(f"Notes: {invoice['notes']}", styles['Normal']))
-        
-    doc.build(elements)
-    
-    buffer.seek(0)
-    return Response(content=buffer.getvalue(), media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=invoice_{invoice['invoice_number']}.pdf"})
+
+    data = detail.model_dump()
+    invoice, items = data["invoice"], data["items"]
+    headers = {"Cache-Control": "private, no-cache"}
+
+    key = pdf.render_key(invoice, items)
+    tag = pdf.render_etag(key)
+    if cache.etag_matches(if_none_match, tag):
+        return Response(status_code=304, headers={**headers, "ETag": tag})
+
+    path = await pdf.render_cached(key, invoice, items)
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"invoice_{invoice['invoice_number']}.pdf",
+        headers={**headers, "ETag": tag}
+    )
@@ -0,0 +1,225 @@
+import sys
+from typing import Dict, List, Tuple
+from backend.dialect import POSTGRES, SQLITE, to_date
+
+# The one definition of the schema for new databases. The baseline migration
+# in backend/migrations.py creates the tables and indexes from it, on either
+# backend, and database/schema.sql is its Postgres rendering for reference:
+#
+#   python -m backend.schema postgresql > database/schema.sql
+#
+# Columns use the logical types below. On Postgres ids are native UUIDs and
+# money is NUMERIC; on SQLite both stay TEXT and REAL as before.
+
+TYPES: Dict[str, Dict[str, str]] = {
+    SQLITE: {
+        "id": "TEXT PRIMARY KEY",
+        "uuid": "TEXT",
+        "text": "TEXT",
+        "int": "INTEGER",
+        "money": "REAL",
+        "date": "DATE",
+        "timestamp": "TIMESTAMP",
+    },
+    POSTGRES: {
+        "id": "UUID PRIMARY KEY DEFAULT gen_random_uuid()",
+        "uuid": "UUID",
+        "text": "TEXT",
+        "int": "INTEGER",
+        "money": "NUMERIC(12, 2)",
+        "date": "DATE",
+        "timestamp": "TIMESTAMP",
+    },
+}
+
+CREATED_AT = ("created_at", "timestamp", "DEFAULT CURRENT_TIMESTAMP")
+
+# table -> [(column, type, constraints)], then any table constraints
+TABLES: Dict[str, List[Tuple[str, ...]]] = {
+    "users": [
+        ("id", "id", ""),
+        ("username", "text", "UNIQUE NOT NULL"),
+        ("email", "text", "UNIQUE NOT NULL"),
+        ("password_hash", "text", "NOT NULL"),
+        ("role", "text", "NOT NULL DEFAULT 'photographer'"),
+        CREATED_AT,
+    ],
+    # HMAC of the token only; rotated on every use
+    "refresh_tokens": [
+        ("id", "id", ""),
+        ("token_hash", "text", "UNIQUE NOT NULL"),
+        ("family_id", "uuid", "NOT NULL"),
+        ("username", "text", "NOT NULL"),
+        ("expires_at", "timestamp", "NOT NULL"),
+        ("revoked_at", "timestamp", ""),
+    ],
+    "cameras": [
+        ("id", "id", ""),
+        ("model_name", "text", "NOT NULL"),
+        ("serial_number", "text", "UNIQUE NOT NULL"),
+        ("purchase_date", "date", ""),
+        ("initial_shutter_count", "int", "DEFAULT 0"),
+        ("current_shutter_count", "int", "DEFAULT 0"),
+        ("purchase_price", "money", "DEFAULT 0.00"),
+        ("max_shutter_life", "int", "DEFAULT 150000"),
+        CREATED_AT,
+    ],
+    "events": [
+        ("id", "id", ""),
+        ("name", "text", "NOT NULL"),
+        ("event_date", "date", "NOT NULL"),
+        ("description", "text", ""),
+        ("base_price", "money", "DEFAULT 0.00"),
+        ("status", "text", "DEFAULT 'planned'"),
+        # Kept in step with event_costs by backend/ledger.py
+        ("total_cost", "money", "DEFAULT 0.00"),
+        ("net_profit", "money", "DEFAULT 0.00"),
+        CREATED_AT,
+    ],
+    "event_costs": [
+        ("id", "id", ""),
+        ("event_id", "uuid", "REFERENCES events(id) ON DELETE CASCADE"),
+        ("cost_type", "text", "NOT NULL"),
+        ("amount", "money", "NOT NULL DEFAULT 0.00"),
+        ("description", "text", ""),
+        CREATED_AT,
+    ],
+    # Shutter history per event
+    "camera_usage": [
+        ("id", "id", ""),
+        ("event_id", "uuid", "REFERENCES events(id) ON DELETE CASCADE"),
+        ("camera_id", "uuid", "REFERENCES cameras(id) ON DELETE SET NULL"),
+        ("shutter_count_used", "int", "DEFAULT 0"),
+        CREATED_AT,
+    ],
+    "transactions": [
+        ("id", "id", ""),
+        ("date", "date", "NOT NULL"),
+        ("type", "text", "NOT NULL"),
+        ("category", "text", "NOT NULL"),
+        ("amount", "money", "NOT NULL DEFAULT 0.00"),
+        ("description", "text", ""),
+        # Statement imports skip rows already present
+        ("content_hash", "text", ""),
+        CREATED_AT,
+    ],
+    "clients": [
+        ("id", "id", ""),
+        ("name", "text", "NOT NULL"),
+        ("email", "text", ""),
+        ("phone", "text", ""),
+        ("notes", "text", ""),
+        CREATED_AT,
+    ],
+    "invoices": [
+        ("id", "id", ""),
+        ("client_id", "uuid", "NOT NULL REFERENCES clients(id)"),
+        ("event_id", "uuid", "REFERENCES events(id)"),
+        ("invoice_number", "text", "UNIQUE NOT NULL"),
+        ("status", "text", "DEFAULT 'DRAFT'"),
+        ("issued_date", "date", ""),
+        ("due_date", "date", ""),
+        ("total_amount", "money", "DEFAULT 0.0"),
+        ("notes", "text", ""),
+        CREATED_AT,
+    ],
+    "invoice_items": [
+        ("id", "id", ""),
+        ("invoice_id", "uuid", "NOT NULL REFERENCES invoices(id)"),
+        # Line order on the invoice
+        ("position", "int", "NOT NULL DEFAULT 0"),
+        ("description", "text", "NOT NULL"),
+        ("quantity", "int", "DEFAULT 1"),
+        ("unit_price", "money", "DEFAULT 0.0"),
+        ("amount", "money", "DEFAULT 0.0"),
+    ],
+    # Maintained by backend/ledger.py
+    "monthly_rollups": [
+        ("month", "date", "NOT NULL"),
+        ("source", "text", "NOT NULL"),
+        ("revenue", "money", "NOT NULL DEFAULT 0.0"),
+        ("expenses", "money", "NOT NULL DEFAULT 0.0"),
+        ("event_count", "int", "NOT NULL DEFAULT 0"),
+        ("PRIMARY KEY (month, source)",),
+    ],
+    # One row per migration applied by backend/migrations.py
+    "schema_migrations": [
+        ("version", "int", "PRIMARY KEY"),
+        ("name", "text", "NOT NULL"),
+        ("applied_at", "timestamp", "DEFAULT CURRENT_TIMESTAMP"),
+    ],
+}
+
+def indexes(dialect: str) -> List[Tuple[str, str, str, bool]]:
+    """
+    (name, table, indexed columns, unique) for every secondary index.
+    """
+    return [
+        # Ledger pages (finance router) walk each source in (date, id) order
+        ("idx_events_event_date", "events", "event_date, id", False),
+        ("idx_event_costs_created_date", "event_costs", f"({to_date('created_at', dialect)}), id", False),
+        ("idx_transactions_date", "transactions", "date, id", False),
+        # Manual transactions of one type within a date range (ledger and rollups)
+        ("idx_transactions_type_date", "transactions", "type, date", False),
+        # An event's costs: expense list, totals rebuild and every cost join
+        ("idx_event_costs_event_id", "event_costs", "event_id", False),
+        # Event list filtered by status, newest first
+        ("idx_events_status_date", "events", "status, event_date, id", False),
+        # Shutter history by event and by camera
+        ("idx_camera_usage_event_id", "camera_usage", "event_id", False),
+        ("idx_camera_usage_camera_id", "camera_usage", "camera_id", False),
+        # Invoice lines are read and replaced per invoice
+        ("idx_invoice_items_invoice_id", "invoice_items", "invoice_id", False),
+        # Invoice list, newest first, optionally for one client or status
+        ("idx_invoices_created_at", "invoices", "created_at, id", False),
+        ("idx_invoices_client_created", "invoices", "client_id, created_at, id", False),
+        ("idx_invoices_status_created", "invoices", "status, created_at, id", False),
+        # ZIP export walks invoices in issued order, optionally for one status
+        ("idx_invoices_issued_date", "invoices", "issued_date, id", False),
+        ("idx_invoices_status_issued", "invoices", "status, issued_date, id", False),
+        # Receivables aging; client_id and total_amount make it covering
+        ("idx_invoices_status_due", "invoices", "status, due_date, client_id, total_amount", False),
+        # Client portal looks up an event's invoices
+        ("idx_invoices_event_id", "invoices", "event_id", False),
+        # Logout and reuse detection revoke a whole token family; expired rows are pruned by date
+        ("idx_refresh_tokens_family", "refresh_tokens", "family_id", False),
+        ("idx_refresh_tokens_expires", "refresh_tokens", "expires_at", False),
+        # Statement imports skip rows whose hash is already present
+        ("idx_transactions_content_hash", "transactions", "content_hash", True),
+    ]
+
+def column_sql(table: str, column: str, dialect: str) -> str:
+    """
+    Type and constraints of one column, as ALTER TABLE ... ADD COLUMN takes them.
+    """
+    for spec in TABLES[table]:
+        if spec[0] == column:
+            _, kind, constraints = spec
+            return f"{TYPES[dialect][kind]} {constraints}".strip()
+    raise KeyError(f"{table}.{column}")
+
+def table_statements(dialect: str) -> List[str]:
+    statements = []
+    for table, specs in TABLES.items():
+        lines = []
+        for spec in specs:
+            if len(spec) == 1:
+                lines.append(spec[0])
+            else:
+                lines.append(f"{spec[0]} {column_sql(table, spec[0], dialect)}")
+        body = ",\n    ".join(lines)
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n)")
+    return statements
+
+def index_statements(dialect: str) -> List[str]:
+    return [
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table}({columns})"
+        for name, table, columns, unique in indexes(dialect)
+    ]
+
+def render(dialect: str) -> str:
+    header = f"-- Generated by `python -m backend.schema {dialect}`; edit backend/schema.py instead.\n\n"
+    return header + "".join(f"{s};\n\n" for s in table_statements(dialect) + index_statements(dialect))
+
+if __name__ == "__main__":
+    sys.stdout.write(render(sys.argv[1] if len(sys.argv) > 1 else POSTGRES))
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+from typing import Dict
+
+# Pragmas applied to every SQLite connection the app opens. Most of them are
+# per-connection settings that reset on each connect, and the databases
+# backend opens a fresh connection per request, so they are set in the
+# sqlite3 connection factory rather than once at startup.
+#
+# WAL lets readers proceed while a write is in progress; synchronous=NORMAL is
+# durable across application crashes in WAL mode and skips an fsync per commit.
+PRAGMAS: Dict[str, str] = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative means KiB: 64MB of page cache per connection
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),
+    "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", "ON"),
+}
+
+# Stored in the database file rather than the connection, and only a
+# connection that can write may change it
+PERSISTENT_PRAGMAS = ("journal_mode",)
+
+def apply_profile(connection: sqlite3.Connection, read_only: bool = False):
+    for name, value in PRAGMAS.items():
+        if value and not (read_only and name in PERSISTENT_PRAGMAS):
+            connection.execute(f"PRAGMA {name} = {value}")
+
+class ProfiledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection factory that applies PRAGMAS as soon as it is opened.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        apply_profile(self)
+
+class ReadOnlyProfiledConnection(sqlite3.Connection):
+    """
+    Factory for `mode=ro` connections; they inherit the journal mode the writer set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        apply_profile(self, read_only=True)
+
+async def active_settings(database) -> Dict[str, str]:
+    """
+    The pragma values a connection from `database` actually ended up with.
+    """
+    settings = {}
+    for name in PRAGMAS:
+        row = await database.fetch_one(query=f"PRAGMA {name}")
+        settings[name] = row[0] if row else None
+    return settings
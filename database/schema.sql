@@ -1,63 +1,157 @@
--- Enable UUID extension
-CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+-- Generated by `python -m backend.schema postgresql`; edit backend/schema.py instead.
 
--- Users Table (Admin & Photographer)
 CREATE TABLE IF NOT EXISTS users (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    username VARCHAR(50) UNIQUE NOT NULL,
-    email VARCHAR(100) UNIQUE NOT NULL,
-    password_hash VARCHAR(255) NOT NULL,
-    role VARCHAR(20) NOT NULL CHECK (role IN ('admin', 'photographer')),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'photographer',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    token_hash TEXT UNIQUE NOT NULL,
+    family_id UUID NOT NULL,
+    username TEXT NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP
 );
 
--- Cameras Table
 CREATE TABLE IF NOT EXISTS cameras (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    model_name VARCHAR(100) NOT NULL,
-    serial_number VARCHAR(100) UNIQUE NOT NULL,
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    model_name TEXT NOT NULL,
+    serial_number TEXT UNIQUE NOT NULL,
     purchase_date DATE,
     initial_shutter_count INTEGER DEFAULT 0,
     current_shutter_count INTEGER DEFAULT 0,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    purchase_price NUMERIC(12, 2) DEFAULT 0.00,
+    max_shutter_life INTEGER DEFAULT 150000,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Events Table
 CREATE TABLE IF NOT EXISTS events (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    name VARCHAR(200) NOT NULL,
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name TEXT NOT NULL,
     event_date DATE NOT NULL,
     description TEXT,
-    base_price DECIMAL(10, 2) DEFAULT 0.00,
-    status VARCHAR(20) DEFAULT 'planned' CHECK (status IN ('planned', 'completed', 'cancelled')),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-    -- Financial fields are calculated via SP, we can store cached values or compute on fly.
-    -- For this design, we'll store cached totals for fast dashboard retrieval, 
-    -- updated via triggers/SP.
-    -- total_cost DECIMAL(10, 2) DEFAULT 0.00,
-    -- net_profit DECIMAL(10, 2) DEFAULT 0.00
+    base_price NUMERIC(12, 2) DEFAULT 0.00,
+    status TEXT DEFAULT 'planned',
+    total_cost NUMERIC(12, 2) DEFAULT 0.00,
+    net_profit NUMERIC(12, 2) DEFAULT 0.00,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Event Costs Table
 CREATE TABLE IF NOT EXISTS event_costs (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     event_id UUID REFERENCES events(id) ON DELETE CASCADE,
-    cost_type VARCHAR(50) NOT NULL, -- 'transport', 'food', 'editing', 'ads', 'other'
-    amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    cost_type TEXT NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL DEFAULT 0.00,
     description TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Camera Usage per Event
 CREATE TABLE IF NOT EXISTS camera_usage (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     event_id UUID REFERENCES events(id) ON DELETE CASCADE,
-    camera_id UUID REFERENCES cameras(id),
+    camera_id UUID REFERENCES cameras(id) ON DELETE SET NULL,
     shutter_count_used INTEGER DEFAULT 0,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    date DATE NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL DEFAULT 0.00,
+    description TEXT,
+    content_hash TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS clients (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT,
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS invoices (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    client_id UUID NOT NULL REFERENCES clients(id),
+    event_id UUID REFERENCES events(id),
+    invoice_number TEXT UNIQUE NOT NULL,
+    status TEXT DEFAULT 'DRAFT',
+    issued_date DATE,
+    due_date DATE,
+    total_amount NUMERIC(12, 2) DEFAULT 0.0,
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Ensure indexes for performance
+CREATE TABLE IF NOT EXISTS invoice_items (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    invoice_id UUID NOT NULL REFERENCES invoices(id),
+    position INTEGER NOT NULL DEFAULT 0,
+    description TEXT NOT NULL,
+    quantity INTEGER DEFAULT 1,
+    unit_price NUMERIC(12, 2) DEFAULT 0.0,
+    amount NUMERIC(12, 2) DEFAULT 0.0
+);
+
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    month DATE NOT NULL,
+    source TEXT NOT NULL,
+    revenue NUMERIC(12, 2) NOT NULL DEFAULT 0.0,
+    expenses NUMERIC(12, 2) NOT NULL DEFAULT 0.0,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, source)
+);
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_event_date ON events(event_date, id);
+
+CREATE INDEX IF NOT EXISTS idx_event_costs_created_date ON event_costs((CAST(created_at AS DATE)), id);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date, id);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions(type, date);
+
 CREATE INDEX IF NOT EXISTS idx_event_costs_event_id ON event_costs(event_id);
+
+CREATE INDEX IF NOT EXISTS idx_events_status_date ON events(status, event_date, id);
+
 CREATE INDEX IF NOT EXISTS idx_camera_usage_event_id ON camera_usage(event_id);
+
 CREATE INDEX IF NOT EXISTS idx_camera_usage_camera_id ON camera_usage(camera_id);
+
+CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id ON invoice_items(invoice_id);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_created_at ON invoices(created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_client_created ON invoices(client_id, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_status_created ON invoices(status, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_issued_date ON invoices(issued_date, id);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_status_issued ON invoices(status, issued_date, id);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_status_due ON invoices(status, due_date, client_id, total_amount);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_event_id ON invoices(event_id);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens(family_id);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires ON refresh_tokens(expires_at);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_content_hash ON transactions(content_hash);
+
@@ -12,12 +12,44 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
+// Refresh tokens are single-use, so parallel 401s must share one refresh call
+let refreshing = null;
+
+const refreshSession = () => {
+    if (!refreshing) {
+        const refreshToken = localStorage.getItem('refresh_token');
+        refreshing = (refreshToken
+            ? axios.post(`${api.defaults.baseURL}/auth/refresh`, { refresh_token: refreshToken }).then((res) => {
+                localStorage.setItem('token', res.data.access_token);
+                localStorage.setItem('refresh_token', res.data.refresh_token);
+            })
+            : Promise.reject(new Error('No refresh token'))
+        ).finally(() => {
+            refreshing = null;
+        });
+    }
+    return refreshing;
+};
+
 api.interceptors.response.use(
     (response) => response,
-    (error) => {
+    async (error) => {
+        const original = error.config;
         if (error.response && error.response.status === 401) {
-            localStorage.removeItem('token');
-            window.location.href = '/login';
+            if (original && !original._retried && !original.url.startsWith('/auth/')) {
+                original._retried = true;
+                try {
+                    await refreshSession();
+                    return api(original);
+                } catch (refreshError) {
+                    // Fall through to the login page
+                }
+            }
+            if (!original || !original.url.startsWith('/auth/token')) {
+                localStorage.removeItem('token');
+                localStorage.removeItem('refresh_token');
+                window.location.href = '/login';
+            }
         }
         return Promise.reject(error);
     }
@@ -1,15 +1,37 @@
-import { startOfMonth, endOfMonth, startOfWeek, endOfWeek, eachDayOfInterval, format, isSameMonth, isSameDay, isToday } from 'date-fns';
+import { startOfMonth, endOfMonth, startOfWeek, endOfWeek, eachDayOfInterval, format, isSameMonth, isToday } from 'date-fns';
 import { ChevronLeftIcon, ChevronRightIcon } from '@heroicons/react/24/outline';
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
+import api from '../api/axios';
+import toast from 'react-hot-toast';
 import { cn } from '../utils/cn';
 import { motion } from 'framer-motion';
 
-const CalendarView = ({ events }) => {
+const CalendarView = () => {
     const [currentDate, setCurrentDate] = useState(new Date());
+    const [eventsByDay, setEventsByDay] = useState({});
 
     const startDate = startOfWeek(startOfMonth(currentDate));
     const endDate = endOfWeek(endOfMonth(currentDate));
 
+    // Only the weeks on screen are fetched; the browser revalidates
+    // months it has already seen with If-None-Match and gets a 304
+    useEffect(() => {
+        const fetchVisibleEvents = async () => {
+            try {
+                const res = await api.get('/events/calendar', {
+                    params: {
+                        from: format(startDate, 'yyyy-MM-dd'),
+                        to: format(endDate, 'yyyy-MM-dd')
+                    }
+                });
+                setEventsByDay(res.data);
+            } catch (err) {
+                toast.error("Failed to load events");
+            }
+        };
+        fetchVisibleEvents();
+    }, [startDate.getTime(), endDate.getTime()]);
+
     const calendarDays = eachDayOfInterval({
         start: startDate,
         end: endDate
@@ -24,7 +46,7 @@ const CalendarView = ({ events }) => {
     };
 
     const getEventsForDay = (day) => {
-        return events.filter(event => isSameDay(new Date(event.event_date), day));
+        return eventsByDay[format(day, 'yyyy-MM-dd')] || [];
     };
 
     const statusColors = {
@@ -3,13 +3,23 @@ import { Toaster } from 'react-hot-toast';
 import { HomeIcon, CalendarIcon, VideoCameraIcon, ArrowLeftOnRectangleIcon, BanknotesIcon, UserGroupIcon, DocumentTextIcon } from '@heroicons/react/24/outline';
 import { cn } from '../utils/cn';
 import { motion } from 'framer-motion';
+import api from '../api/axios';
 
 const Layout = () => {
     const navigate = useNavigate();
     const location = useLocation();
 
-    const handleLogout = () => {
+    const handleLogout = async () => {
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (refreshToken) {
+            try {
+                await api.post('/auth/logout', { refresh_token: refreshToken });
+            } catch (err) {
+                console.error("Failed to revoke session", err);
+            }
+        }
         localStorage.removeItem('token');
+        localStorage.removeItem('refresh_token');
         navigate('/login');
     };
 
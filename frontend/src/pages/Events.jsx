@@ -8,9 +8,13 @@ import { cn } from '../utils/cn';
 import { motion, AnimatePresence } from 'framer-motion';
 import CalendarView from '../components/CalendarView';
 
+const PAGE_SIZE = 50;
+
 const Events = () => {
     const navigate = useNavigate();
     const [events, setEvents] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [search, setSearch] = useState('');
     const [viewMode, setViewMode] = useState('list'); // 'list' | 'board' | 'calendar'
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [copiedId, setCopiedId] = useState(null);
@@ -32,19 +36,34 @@ const Events = () => {
         { id: 'completed', title: 'Completed', color: 'bg-emerald-500/10 text-emerald-400 border-emerald-500/20' }
     ];
 
+    const eventParams = () => ({ limit: PAGE_SIZE, ...(search && { name: search }) });
+
     const fetchEvents = async () => {
         try {
-            const res = await api.get('/events/');
+            const res = await api.get('/events/', { params: eventParams() });
             setEvents(res.data);
+            setNextCursor(res.headers['x-next-cursor'] || null);
         } catch (err) {
             console.error(err);
             toast.error(`Error: ${err.message}`);
         }
     };
 
+    const loadMoreEvents = async () => {
+        try {
+            const res = await api.get('/events/', { params: { ...eventParams(), after: nextCursor } });
+            setEvents(prev => [...prev, ...res.data]);
+            setNextCursor(res.headers['x-next-cursor'] || null);
+        } catch (err) {
+            toast.error("Failed to load more events");
+        }
+    };
+
     useEffect(() => {
-        fetchEvents();
-    }, []);
+        // Debounce typing in the search box
+        const timer = setTimeout(fetchEvents, 250);
+        return () => clearTimeout(timer);
+    }, [search]);
 
     const handleCreateEvent = async (e) => {
         e.preventDefault();
@@ -126,6 +145,15 @@ const Events = () => {
                     <p className="text-slate-400 mt-1">Manage your photography assignments</p>
                 </div>
                 <div className="flex items-center gap-4">
+                    {viewMode !== 'calendar' && (
+                        <input
+                            type="search"
+                            placeholder="Search by name..."
+                            className="bg-white/5 border border-white/10 rounded-xl px-4 py-2.5 text-sm text-white placeholder-slate-500 focus:outline-none focus:ring-2 focus:ring-indigo-500/50"
+                            value={search}
+                            onChange={(e) => setSearch(e.target.value)}
+                        />
+                    )}
                     {/* View Switcher */}
                     <div className="bg-white/5 p-1 rounded-xl flex border border-white/10">
                         <button
@@ -232,6 +260,16 @@ const Events = () => {
                             </div>
                         )}
                     </ul>
+                    {nextCursor && (
+                        <div className="p-4 border-t border-white/5 flex justify-center">
+                            <button
+                                onClick={loadMoreEvents}
+                                className="px-5 py-2 text-sm font-medium text-slate-300 hover:text-white hover:bg-white/5 rounded-xl transition-colors border border-white/10"
+                            >
+                                Load more
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
@@ -292,11 +330,21 @@ const Events = () => {
                             </div>
                         </div>
                     ))}
+                    {nextCursor && (
+                        <div className="md:col-span-4 flex justify-center">
+                            <button
+                                onClick={loadMoreEvents}
+                                className="px-5 py-2 text-sm font-medium text-slate-300 hover:text-white hover:bg-white/5 rounded-xl transition-colors border border-white/10"
+                            >
+                                Load more
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
             {viewMode === 'calendar' && (
-                <CalendarView events={events} />
+                <CalendarView />
             )}
 
             <Modal isOpen={isModalOpen} closeModal={() => setIsModalOpen(false)} title="Create New Event">
@@ -2,13 +2,16 @@
 import { useEffect, useState } from 'react';
 import api from '../api/axios';
 import { motion } from 'framer-motion';
-import { ArrowTrendingUpIcon, ArrowTrendingDownIcon, CurrencyDollarIcon, PlusIcon, PencilIcon, TrashIcon } from '@heroicons/react/24/outline';
+import { ArrowTrendingUpIcon, ArrowTrendingDownIcon, CurrencyDollarIcon, PlusIcon, PencilIcon, TrashIcon, ArrowDownTrayIcon, ArrowUpTrayIcon } from '@heroicons/react/24/outline';
 import { cn } from '../utils/cn';
 import toast from 'react-hot-toast';
 import Modal from '../components/Modal';
 
+const PAGE_SIZE = 50;
+
 const Finance = () => {
     const [transactions, setTransactions] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [stats, setStats] = useState({
         totalCredit: 0,
         totalDebit: 0,
@@ -26,27 +29,33 @@ const Finance = () => {
 
     const fetchTransactions = async () => {
         try {
-            const res = await api.get('/finance/transactions');
+            const [res, summaryRes] = await Promise.all([
+                api.get('/finance/transactions', { params: { limit: PAGE_SIZE } }),
+                api.get('/finance/summary')
+            ]);
             setTransactions(res.data);
-
-            // Calculate stats
-            let credit = 0;
-            let debit = 0;
-            res.data.forEach(t => {
-                if (t.type === 'Credit') credit += t.amount;
-                if (t.type === 'Debit') debit += t.amount;
-            });
+            setNextCursor(res.headers['x-next-cursor'] || null);
 
             setStats({
-                totalCredit: credit,
-                totalDebit: debit,
-                netProfit: credit - debit
+                totalCredit: summaryRes.data.total_credit,
+                totalDebit: summaryRes.data.total_debit,
+                netProfit: summaryRes.data.net_profit
             });
         } catch (err) {
             toast.error("Failed to load financial data");
         }
     };
 
+    const loadMoreTransactions = async () => {
+        try {
+            const res = await api.get('/finance/transactions', { params: { limit: PAGE_SIZE, after: nextCursor } });
+            setTransactions(prev => [...prev, ...res.data]);
+            setNextCursor(res.headers['x-next-cursor'] || null);
+        } catch (err) {
+            toast.error("Failed to load more transactions");
+        }
+    };
+
     const handleAddTransaction = async (e) => {
         e.preventDefault();
 
@@ -110,6 +119,37 @@ const Finance = () => {
         }
     };
 
+    const handleExportLedger = async () => {
+        try {
+            const res = await api.get('/finance/export', { params: { format: 'csv' }, responseType: 'blob' });
+            const url = window.URL.createObjectURL(new Blob([res.data]));
+            const link = document.createElement('a');
+            link.href = url;
+            link.setAttribute('download', 'ledger.csv');
+            document.body.appendChild(link);
+            link.click();
+            link.remove();
+        } catch (err) {
+            toast.error("Failed to export ledger");
+        }
+    };
+
+    const handleImportStatement = async (e) => {
+        const file = e.target.files[0];
+        e.target.value = '';
+        if (!file) return;
+        const data = new FormData();
+        data.append('file', file);
+        try {
+            const res = await api.post('/finance/import', data);
+            const { imported, duplicates, errors } = res.data;
+            toast.success(`Imported ${imported} rows (${duplicates} duplicates, ${errors} errors)`);
+            fetchTransactions();
+        } catch (err) {
+            toast.error(err.response?.data?.detail || "Failed to import statement");
+        }
+    };
+
     useEffect(() => {
         fetchTransactions();
     }, []);
@@ -204,8 +244,26 @@ const Finance = () => {
                 transition={{ delay: 0.4 }}
                 className="bg-white/5 backdrop-blur-sm border border-white/10 rounded-3xl overflow-hidden shadow-xl"
             >
-                <div className="p-6 border-b border-white/5">
+                <div className="p-6 border-b border-white/5 flex justify-between items-center">
                     <h2 className="text-xl font-bold text-white">Recent Transactions</h2>
+                    <div className="flex items-center gap-2">
+                        <label
+                            className="flex items-center gap-2 px-4 py-2 text-sm font-medium text-slate-300 hover:text-white hover:bg-white/5 rounded-xl transition-colors cursor-pointer"
+                            title="Import bank statement CSV (date,type,category,amount,description)"
+                        >
+                            <ArrowUpTrayIcon className="w-4 h-4" />
+                            Import CSV
+                            <input type="file" accept=".csv,text/csv" className="hidden" onChange={handleImportStatement} />
+                        </label>
+                        <button
+                            onClick={handleExportLedger}
+                            className="flex items-center gap-2 px-4 py-2 text-sm font-medium text-slate-300 hover:text-white hover:bg-white/5 rounded-xl transition-colors"
+                            title="Export full ledger as CSV"
+                        >
+                            <ArrowDownTrayIcon className="w-4 h-4" />
+                            Export CSV
+                        </button>
+                    </div>
                 </div>
                 <div className="overflow-x-auto">
                     <table className="w-full">
@@ -280,6 +338,16 @@ const Finance = () => {
                         </tbody>
                     </table>
                 </div>
+                {nextCursor && (
+                    <div className="p-4 border-t border-white/5 flex justify-center">
+                        <button
+                            onClick={loadMoreTransactions}
+                            className="px-5 py-2 text-sm font-medium text-slate-300 hover:text-white hover:bg-white/5 rounded-xl transition-colors"
+                        >
+                            Load more
+                        </button>
+                    </div>
+                )}
             </motion.div>
 
             <Modal isOpen={isModalOpen} closeModal={() => setIsModalOpen(false)} title={editingTransaction ? "Edit Transaction" : "Add Transaction"}>
@@ -4,17 +4,28 @@ import { PlusIcon, DocumentTextIcon, ArrowDownTrayIcon, MagnifyingGlassIcon } fr
 import { useNavigate } from 'react-router-dom';
 import { cn } from '../utils/cn';
 
+const PAGE_SIZE = 50;
+
 const Invoices = () => {
     const [invoices, setInvoices] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState('');
+    const [statusFilter, setStatusFilter] = useState('');
     const navigate = useNavigate();
 
+    // 'OVERDUE' is a filter, not a stored status
+    const invoiceParams = () => ({
+        limit: PAGE_SIZE,
+        ...(statusFilter === 'OVERDUE' ? { overdue: true } : statusFilter && { status: statusFilter })
+    });
+
     const fetchInvoices = async () => {
         try {
-            const res = await api.get('/invoices/');
+            const res = await api.get('/invoices/', { params: invoiceParams() });
             if (Array.isArray(res.data)) {
                 setInvoices(res.data);
+                setNextCursor(res.headers['x-next-cursor'] || null);
             } else {
                 console.error("API returned non-array:", res.data);
                 setInvoices([]);
@@ -27,9 +38,19 @@ const Invoices = () => {
         }
     };
 
+    const loadMoreInvoices = async () => {
+        try {
+            const res = await api.get('/invoices/', { params: { ...invoiceParams(), after: nextCursor } });
+            setInvoices(prev => [...prev, ...res.data]);
+            setNextCursor(res.headers['x-next-cursor'] || null);
+        } catch (err) {
+            console.error("Failed to load more invoices", err);
+        }
+    };
+
     useEffect(() => {
         fetchInvoices();
-    }, []);
+    }, [statusFilter]);
 
     const getStatusColor = (status) => {
         switch (status) {
@@ -89,15 +110,29 @@ const Invoices = () => {
             </div>
 
             {/* Search */}
-            <div className="relative max-w-md">
-                <MagnifyingGlassIcon className="absolute left-3 top-1/2 -translate-y-1/2 w-5 h-5 text-slate-500" />
-                <input
-                    type="text"
-                    placeholder="Search invoices..."
-                    className="w-full bg-slate-800/50 border border-white/10 rounded-xl pl-10 pr-4 py-3 text-white focus:outline-none focus:border-pumpkin/50 transition-colors"
-                    value={searchTerm}
-                    onChange={(e) => setSearchTerm(e.target.value)}
-                />
+            <div className="flex flex-col md:flex-row gap-4">
+                <div className="relative flex-1 max-w-md">
+                    <MagnifyingGlassIcon className="absolute left-3 top-1/2 -translate-y-1/2 w-5 h-5 text-slate-500" />
+                    <input
+                        type="text"
+                        placeholder="Search invoices..."
+                        className="w-full bg-slate-800/50 border border-white/10 rounded-xl pl-10 pr-4 py-3 text-white focus:outline-none focus:border-pumpkin/50 transition-colors"
+                        value={searchTerm}
+                        onChange={(e) => setSearchTerm(e.target.value)}
+                    />
+                </div>
+                <select
+                    className="bg-slate-800/50 border border-white/10 rounded-xl px-4 py-3 text-white focus:outline-none focus:border-pumpkin/50 transition-colors"
+                    value={statusFilter}
+                    onChange={(e) => setStatusFilter(e.target.value)}
+                >
+                    <option value="">All statuses</option>
+                    <option value="DRAFT">Draft</option>
+                    <option value="SENT">Sent</option>
+                    <option value="OVERDUE">Overdue</option>
+                    <option value="PAID">Paid</option>
+                    <option value="CANCELLED">Cancelled</option>
+                </select>
             </div>
 
             {/* List */}
@@ -149,6 +184,16 @@ const Invoices = () => {
                         )}
                     </tbody>
                 </table>
+                {nextCursor && (
+                    <div className="p-4 border-t border-white/5 flex justify-center">
+                        <button
+                            onClick={loadMoreInvoices}
+                            className="px-5 py-2 text-sm font-medium text-slate-300 hover:text-white hover:bg-white/5 rounded-xl transition-colors border border-white/10"
+                        >
+                            Load more
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -19,13 +19,18 @@ const Login = () => {
 
             const response = await api.post('/auth/token', formData);
             localStorage.setItem('token', response.data.access_token);
+            localStorage.setItem('refresh_token', response.data.refresh_token);
 
             toast.dismiss(loadingToast);
             toast.success('Welcome back, Owner.');
             navigate('/');
         } catch (err) {
             toast.dismiss(loadingToast);
-            toast.error('Access Denied: Invalid credentials');
+            if (err.response?.status === 503) {
+                toast.error('Server is busy signing others in, please try again in a moment');
+            } else {
+                toast.error('Access Denied: Invalid credentials');
+            }
         }
     };
 
@@ -1,8 +1,12 @@
 import asyncio
 import os
+import sys
 import asyncpg
 from dotenv import load_dotenv
 
+# Add parent directory to path so we can import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 load_dotenv()
 
 POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
@@ -15,6 +19,12 @@ POSTGRES_DB = os.getenv("POSTGRES_DB", "business_photography")
 ROOT_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/postgres"
 TARGET_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+# Migrations run through the backend's own connection, so point it at the target
+os.environ["DATABASE_URL"] = TARGET_DATABASE_URL
+
+from backend.database import connect, disconnect
+from backend.migrations import migrate
+
 async def create_database_if_not_exists():
     conn = await asyncpg.connect(ROOT_DATABASE_URL)
     try:
@@ -38,15 +48,20 @@ async def run_sql_file(conn, file_path):
 async def init_db():
     await create_database_if_not_exists()
     
+    # Tables and indexes come from the migrations, as on SQLite
+    await connect()
+    try:
+        await migrate()
+    finally:
+        await disconnect()
+
     conn = await asyncpg.connect(TARGET_DATABASE_URL)
     try:
         # Determine paths relative to this script
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        schema_path = os.path.join(base_dir, 'database', 'schema.sql')
         procedures_path = os.path.join(base_dir, 'database', 'procedures.sql')
         seed_path = os.path.join(base_dir, 'database', 'seed.sql')
 
-        await run_sql_file(conn, schema_path)
         await run_sql_file(conn, procedures_path)
         await run_sql_file(conn, seed_path)
         
@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+import os
+import sys
+
+# Add parent directory to path so we can import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import connect, disconnect
+from backend.migrations import LATEST_VERSION, current_version, migrate
+
+# Brings the database at DATABASE_URL up to the latest migration. Run on every
+# container boot; when nothing is pending it reads the schema version and exits.
+
+async def main(check: bool):
+    await connect()
+    try:
+        if check:
+            version = await current_version()
+            print(f"Schema version {version} of {LATEST_VERSION}.")
+            return version == LATEST_VERSION
+        applied = await migrate()
+        if not applied:
+            print(f"Schema is up to date (version {LATEST_VERSION}).")
+        return True
+    finally:
+        await disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to DATABASE_URL")
+    parser.add_argument("--check", action="store_true", help="only report the version; exit 1 if migrations are pending")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.check)) else 1)
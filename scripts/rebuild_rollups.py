@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import sys
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path so we can import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import database
+from backend.ledger import find_rollup_drift, rebuild_rollups
+
+async def main(check_only: bool) -> int:
+    load_dotenv()
+    await database.connect()
+    try:
+        drift = await find_rollup_drift()
+        for d in drift:
+            print(f"Drift in {d['month']} [{d['source']}] {d['field']}: expected {d['expected']}, stored {d['actual']}")
+        if not drift:
+            print("Monthly rollups match the source tables.")
+
+        if check_only:
+            return 1 if drift else 0
+
+        await rebuild_rollups()
+        print("Monthly rollups rebuilt.")
+        return 0
+    finally:
+        await database.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute monthly_rollups from events, event_costs and transactions.")
+    parser.add_argument("--check", action="store_true", help="Only report drift; exit 1 if any is found")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.check)))